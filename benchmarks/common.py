@@ -0,0 +1,49 @@
+# benchmarks/common.py
+
+
+import os
+import statistics
+import tempfile
+from contextlib import contextmanager
+from datetime import date
+
+# seeded data ends on a fixed Sunday so every run sees the same weeks
+DATA_END = date(2024, 12, 29)
+
+
+def percentile(samples, pct):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(round(pct / 100 * (len(samples) - 1))))]
+
+
+def summary(samples):
+    return dict(
+        count=len(samples),
+        p50_ms=round(statistics.median(samples) * 1000, 2) if samples else None,
+        p95_ms=round(percentile(samples, 95) * 1000, 2) if samples else None,
+        p99_ms=round(percentile(samples, 99) * 1000, 2) if samples else None,
+    )
+
+
+@contextmanager
+def benchmark_app(**config):
+    """A TestingConfig app on a throwaway SQLite file with the tables created.
+
+    The environment is set before the project is imported, so this must run
+    before anything else imports project.server.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["APP_SETTINGS"] = "project.server.config.TestingConfig"
+        os.environ["DATABASE_TEST_URL"] = "sqlite:///{0}".format(os.path.join(tmp, "bench.sqlite3"))
+
+        from project.server import create_app, db
+
+        app = create_app()
+        app.config.update(config)
+        with app.app_context():
+            db.create_all()
+        try:
+            yield app
+        finally:
+            with app.app_context():
+                db.engine.dispose()
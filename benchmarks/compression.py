@@ -0,0 +1,103 @@
+# benchmarks/compression.py
+#
+# Response compression: bytes saved and CPU spent per request, in process.
+#
+#   python -m benchmarks.compression --children 50 --iterations 50
+#   python -m benchmarks.compression --level 1 --output compression.json
+
+
+import argparse
+import json
+import statistics
+import time
+from datetime import timedelta
+
+from benchmarks.common import DATA_END, benchmark_app
+
+PAGES = {
+    "main.home": "/",
+    "main.summary": "/summary/?start_of_week={week}",
+    "main.history": "/history/?limit=200",
+    "user.setup": "/setup",
+    "export csv": "/export/completions?format=csv&start={month}",
+}
+
+
+def measure(client, path, encodings, iterations):
+    """Bytes sent and median CPU milliseconds per request for each Accept-Encoding.
+
+    Encodings take turns request by request, so drift hits them all alike.
+    """
+    sizes, samples = {}, {encoding: [] for encoding in encodings}
+    for encoding in encodings:
+        response = client.get(path, headers={"Accept-Encoding": encoding})
+        assert response.status_code == 200, (path, response.status_code)
+        assert response.headers.get("Content-Encoding", "identity") == encoding, (path, encoding)
+        sizes[encoding] = len(response.data)
+    for _ in range(iterations):
+        for encoding in encodings:
+            started = time.process_time()
+            client.get(path, headers={"Accept-Encoding": encoding}).close()
+            samples[encoding].append(time.process_time() - started)
+    return {encoding: dict(bytes=sizes[encoding], cpu_ms=round(statistics.median(samples[encoding]) * 1000, 3))
+            for encoding in encodings}
+
+
+def run(children, chores, years, seed, iterations, level, min_size):
+    with benchmark_app() as app:
+        from project.server import compression
+
+        # the middleware was set up from the config when the app was created
+        app.wsgi_app.level = level
+        app.wsgi_app.min_size = min_size
+        from project.server.sample_data import generate_data
+        from project.server.services import week_start_for
+
+        with app.app_context():
+            generate_data(children=children, chores=chores, users=3, years=years, seed=seed, end=DATA_END)
+
+        client = app.test_client()
+        response = client.post("/login", data=dict(user_name="user0000", password="password"))
+        assert response.status_code == 302, response.status_code
+
+        encodings = ["identity", "gzip"] + (["br"] if compression.brotli is not None else [])
+        week = week_start_for(DATA_END) - timedelta(days=7)
+        month = DATA_END - timedelta(days=30)
+        results = {}
+        for name, path in PAGES.items():
+            path = path.format(week=week, month=month)
+            results[name] = measure(client, path, encodings, iterations)
+    return dict(level=level, min_size=min_size, iterations=iterations, pages=results)
+
+
+def print_table(results):
+    print(f"{'page':<14} {'encoding':<9} {'bytes':>9} {'saved':>7} {'cpu ms':>8} {'+cpu ms':>8}")
+    for name, by_encoding in results["pages"].items():
+        plain = by_encoding["identity"]
+        for encoding, result in by_encoding.items():
+            saved = 1 - result["bytes"] / plain["bytes"] if plain["bytes"] else 0
+            print(f"{name:<14} {encoding:<9} {result['bytes']:>9} {saved:>7.1%} {result['cpu_ms']:>8} "
+                  f"{result['cpu_ms'] - plain['cpu_ms']:>8.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Response compression benchmark.")
+    parser.add_argument("--children", type=int, default=20)
+    parser.add_argument("--chores", type=int, default=20)
+    parser.add_argument("--years", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--iterations", type=int, default=30)
+    parser.add_argument("--level", type=int, default=6, help="gzip level.")
+    parser.add_argument("--min-size", type=int, default=500, help="Smallest body compressed, in bytes.")
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    args = parser.parse_args()
+
+    results = run(args.children, args.chores, args.years, args.seed, args.iterations, args.level, args.min_size)
+    print_table(results)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
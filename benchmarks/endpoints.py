@@ -0,0 +1,190 @@
+# benchmarks/endpoints.py
+#
+# In-process endpoint benchmarks: latency, SQL statements and rows fetched.
+#
+#   python -m benchmarks.endpoints run --children 50 --years 2 --output results.json
+#   python -m benchmarks.endpoints compare benchmarks/baseline.json results.json
+
+
+import argparse
+import json
+import sys
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from sqlalchemy import event
+
+from benchmarks.common import DATA_END, benchmark_app, summary
+
+ENDPOINTS = {
+    "main.home": "/",
+    "main.summary": "/summary/?start_of_week={week}",
+    "user.approval": "/approval/?start_of_week={week}",
+    "user.setup": "/setup",
+}
+# pages answering conditional GETs, also measured revalidating with their ETag
+# and rendering from the page cache, which is off for the uncached numbers
+REVALIDATED = ("main.summary", "user.approval")
+
+
+@contextmanager
+def capture_statements(engine):
+    """Collects (statement, parameters) for every SQL statement run in the block."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def rows_fetched(engine, statements):
+    """Rows the SELECTs return, counted by re-running them wrapped in count(*)."""
+    rows = 0
+    with engine.connect() as connection:
+        for statement, parameters in statements:
+            if statement.lstrip().upper().startswith("SELECT"):
+                rows += connection.exec_driver_sql(f"SELECT count(*) FROM ({statement})", parameters).scalar()
+    return rows
+
+
+def measure(engine, client, path, iterations, warmup, headers=None, status=200):
+    for _ in range(warmup):
+        client.get(path, headers=headers)
+    with capture_statements(engine) as statements:
+        response = client.get(path, headers=headers)
+    assert response.status_code == status, (path, response.status_code)
+
+    timings = []
+    for _ in range(iterations):
+        started = time.perf_counter()
+        client.get(path, headers=headers)
+        timings.append(time.perf_counter() - started)
+    return dict(summary(timings), statements=len(statements), rows=rows_fetched(engine, statements))
+
+
+def run(children, chores, years, per_day, seed, iterations, warmup):
+    with benchmark_app() as app:
+        from project.server import db
+        from project.server.cache import page_cache
+        from project.server.sample_data import generate_data
+        from project.server.services import week_start_for
+
+        # rendered pages first, the cached ones are measured last
+        app.config["PAGE_CACHE_SIZE"] = 0
+        page_cache.init_app(app)
+        with app.app_context():
+            completions = generate_data(children=children, chores=chores, users=3, years=years,
+                                        per_day=per_day, seed=seed, end=DATA_END)
+            engine = db.engine
+
+        client = app.test_client()
+        response = client.post("/login", data=dict(user_name="user0000", password="password"))
+        assert response.status_code == 302, response.status_code
+
+        week = week_start_for(DATA_END) - timedelta(days=7)
+        results = {
+            name: measure(engine, client, path.format(week=week), iterations, warmup)
+            for name, path in ENDPOINTS.items()
+        }
+        for name in REVALIDATED:
+            path = ENDPOINTS[name].format(week=week)
+            etag = client.get(path).headers["ETag"]
+            results[f"{name} 304"] = measure(engine, client, path, iterations, warmup,
+                                             headers={"If-None-Match": etag}, status=304)
+
+        app.config["PAGE_CACHE_SIZE"] = 256
+        page_cache.init_app(app)
+        for name in REVALIDATED:
+            results[f"{name} cached"] = measure(engine, client, ENDPOINTS[name].format(week=week),
+                                                iterations, warmup)
+    return dict(
+        dataset=dict(children=children, chores=chores, years=years, per_day=per_day, seed=seed,
+                     completions=completions),
+        iterations=iterations,
+        endpoints=results,
+    )
+
+
+def compare(baseline, current, tolerance, min_ms=2.0):
+    """Regressions of current against baseline as human readable lines.
+
+    Latency is flagged once it grows by more than ``tolerance`` (a fraction)
+    and by more than ``min_ms``, so timer noise on fast pages is ignored.
+    Statement and row counts are deterministic and must not grow at all.
+    """
+    regressions = []
+    if baseline["dataset"] != current["dataset"]:
+        regressions.append(f"dataset differs: {baseline['dataset']} != {current['dataset']}")
+    for name, before in baseline["endpoints"].items():
+        after = current["endpoints"].get(name)
+        if after is None:
+            regressions.append(f"{name}: missing from current run")
+            continue
+        for key in ("p50_ms", "p95_ms"):
+            if after[key] > before[key] * (1 + tolerance) and after[key] - before[key] > min_ms:
+                regressions.append(f"{name}: {key} {before[key]} -> {after[key]}")
+        for key in ("statements", "rows"):
+            if after[key] > before[key]:
+                regressions.append(f"{name}: {key} {before[key]} -> {after[key]}")
+    return regressions
+
+
+def print_table(results):
+    print(f"{'endpoint':<20} {'p50 ms':>8} {'p95 ms':>8} {'sql':>5} {'rows':>8}")
+    for name, result in results["endpoints"].items():
+        print(f"{name:<20} {result['p50_ms']:>8} {result['p95_ms']:>8} {result['statements']:>5} {result['rows']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="In-process endpoint benchmarks.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Seed a dataset and benchmark the endpoints.")
+    run_parser.add_argument("--children", type=int, default=20)
+    run_parser.add_argument("--chores", type=int, default=20)
+    run_parser.add_argument("--years", type=int, default=1)
+    run_parser.add_argument("--per-day", type=float, default=3.0)
+    run_parser.add_argument("--seed", type=int, default=0)
+    run_parser.add_argument("--iterations", type=int, default=50)
+    run_parser.add_argument("--warmup", type=int, default=5)
+    run_parser.add_argument("--output", help="Write the results to this JSON file.")
+    run_parser.add_argument("--baseline", help="Compare against this JSON file and fail on regressions.")
+    run_parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed latency growth.")
+    run_parser.add_argument("--min-ms", type=float, default=2.0, help="Latency growth always allowed.")
+
+    compare_parser = commands.add_parser("compare", help="Compare two result files.")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed latency growth.")
+    compare_parser.add_argument("--min-ms", type=float, default=2.0, help="Latency growth always allowed.")
+
+    args = parser.parse_args()
+    if args.command == "run":
+        current = run(args.children, args.chores, args.years, args.per_day, args.seed,
+                      args.iterations, args.warmup)
+        print_table(current)
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(current, f, indent=2)
+    else:
+        with open(args.current) as f:
+            current = json.load(f)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(json.load(f), current, args.tolerance, args.min_ms)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        if regressions:
+            sys.exit(1)
+        print("No regressions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+# benchmarks/load.py
+#
+# HTTP load test against gunicorn on localhost, with the production config
+# and gunicorn_config.py, on a seeded temporary SQLite database.
+#
+#   python -m benchmarks.load --clients 20 --duration 15 --mix post=2,summary=1,approval=1
+#   python -m benchmarks.load --workers 1,2,4 --threads 1,4 --output sweep.json
+
+
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import random
+import re
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import timedelta
+from urllib.parse import urlencode
+
+from benchmarks.common import DATA_END, summary
+
+basedir = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+CSRF_TOKEN = re.compile(rb'name="csrf_token" type="hidden" value="([^"]+)"')
+
+
+def seed_database(path, children, chores, users, years, seed):
+    """Seeds a template database once, every run gets a fresh copy of it.
+
+    Returns the number of completions seeded.
+    """
+    os.environ["APP_SETTINGS"] = "project.server.config.TestingConfig"
+    os.environ["DATABASE_TEST_URL"] = f"sqlite:///{path}"
+
+    from project.server import create_app, db
+    from project.server.models import User
+    from project.server.sample_data import generate_data
+
+    app = create_app()
+    # hash the shared password at the production cost, so logins do not rehash
+    app.config["BCRYPT_LOG_ROUNDS"] = 13
+    with app.app_context():
+        db.create_all()
+        seeded = generate_data(children=children, chores=chores, users=users, years=years, seed=seed,
+                               end=DATA_END)
+        # every load user may open the approval page
+        db.session.query(User).update({"admin": True})
+        db.session.commit()
+        db.engine.dispose()
+    return seeded
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_gunicorn(database, port, workers, threads, log):
+    env = dict(
+        os.environ,
+        APP_SETTINGS="project.server.config.ProductionConfig",
+        PROD_DATABASE_URL=f"sqlite:///{database}",
+        METRICS_DIR=os.path.join(os.path.dirname(database), "metrics"),
+    )
+    env.pop("FLASK_RUN_FROM_CLI", None)
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "--config", "gunicorn_config.py", "--bind", f"127.0.0.1:{port}",
+         "--workers", str(workers), "--threads", str(threads), "wsgi:app"],
+        cwd=basedir, env=env, stdout=log, stderr=subprocess.STDOUT,
+    )
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if server.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with {server.returncode}, see {log.name}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return server
+        except OSError:
+            time.sleep(0.1)
+    server.terminate()
+    raise RuntimeError("gunicorn did not start listening within 30s")
+
+
+class Client(object):
+    """A tiny HTTP/1.1 client with a cookie jar, one connection per request."""
+
+    def __init__(self, port, timeout):
+        self.port = port
+        self.timeout = timeout
+        self.cookies = {}
+
+    async def request(self, method, path, body=b"", content_type=None):
+        return await asyncio.wait_for(self._request(method, path, body, content_type), self.timeout)
+
+    async def _request(self, method, path, body, content_type):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+        try:
+            lines = [f"{method} {path} HTTP/1.1", f"Host: 127.0.0.1:{self.port}", "Connection: close",
+                     f"Content-Length: {len(body)}"]
+            if content_type:
+                lines.append(f"Content-Type: {content_type}")
+            if self.cookies:
+                lines.append("Cookie: " + "; ".join(f"{k}={v}" for k, v in self.cookies.items()))
+            writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+            await writer.drain()
+            response = await reader.read()
+        finally:
+            writer.close()
+        head, _, payload = response.partition(b"\r\n\r\n")
+        status_line, *header_lines = head.decode("latin-1").split("\r\n")
+        for line in header_lines:
+            name, _, value = line.partition(":")
+            if name.lower() == "set-cookie":
+                cookie, _, _ = value.strip().partition(";")
+                key, _, val = cookie.partition("=")
+                self.cookies[key] = val
+        return int(status_line.split()[1]), payload
+
+    async def login(self, user_name, password):
+        _, page = await self.request("GET", "/login")
+        form = dict(user_name=user_name, password=password)
+        token = CSRF_TOKEN.search(page)
+        if token:
+            form["csrf_token"] = token.group(1).decode()
+        status, _ = await self.request("POST", "/login", urlencode(form).encode(),
+                                       "application/x-www-form-urlencoded")
+        if status != 302:
+            raise RuntimeError(f"login for {user_name} failed with {status}")
+
+
+# completions are posted into the last weeks of the seeded data
+RECENT_WEEKS = 4
+
+
+def make_operations(rng, children, chores, batch):
+    weeks = [DATA_END - timedelta(days=DATA_END.weekday() + 7 * i) for i in range(RECENT_WEEKS)]
+
+    def post():
+        items = [dict(child_id=rng.randint(1, children), chore_id=rng.randint(1, chores),
+                      completed_on=(rng.choice(weeks) + timedelta(days=rng.randrange(7))).isoformat())
+                 for _ in range(batch)]
+        return "POST", "/api/completions", json.dumps(items).encode(), "application/json"
+
+    def summary_page():
+        return "GET", f"/summary/?start_of_week={rng.choice(weeks)}", b"", None
+
+    def approval_page():
+        return "GET", f"/approval/?start_of_week={rng.choice(weeks)}", b"", None
+
+    return dict(post=post, summary=summary_page, approval=approval_page)
+
+
+async def drive(client, operations, weights, rng, deadline, samples, created):
+    names = list(weights)
+    cum = list(itertools.accumulate(weights[name] for name in names))
+    while time.monotonic() < deadline:
+        name = rng.choices(names, cum_weights=cum)[0]
+        method, path, body, content_type = operations[name]()
+        started = time.perf_counter()
+        try:
+            status, payload = await client.request(method, path, body, content_type)
+        except asyncio.TimeoutError:
+            status = "timeout"
+        except OSError:
+            status = "connection error"
+        samples.append((name, status, time.perf_counter() - started))
+        if name == "post" and status == 201:
+            created.append(json.loads(payload)["created"])
+
+
+async def load(port, clients, users, duration, weights, children, chores, batch, timeout, seed):
+    pool = [Client(port, timeout) for _ in range(clients)]
+    for index, client in enumerate(pool):
+        await client.login(f"user{index % users:04d}", "password")
+
+    samples, created = [], []
+    deadline = time.monotonic() + duration
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        drive(client, make_operations(rng, children, chores, batch), weights, rng, deadline, samples, created)
+        for client, rng in ((client, random.Random(seed + i)) for i, client in enumerate(pool))
+    ])
+    return samples, sum(created), time.perf_counter() - started
+
+
+def check_totals(database, seeded_completions, acknowledged):
+    """Compares the ledger with every rollup table and with what clients were told."""
+    from sqlalchemy import create_engine, func, select
+
+    from project.server.models import CompletedChore
+    from project.server.reconcile import daily_sums_query, expected_totals
+    from project.server.services import ROLLUPS
+
+    engine = create_engine(f"sqlite:///{database}")
+    with engine.connect() as connection:
+        expected = expected_totals(connection.execute(daily_sums_query()).all())
+        mismatched = 0
+        for model, period_column, _ in ROLLUPS:
+            want = expected.get(model, {})
+            stored = {(child_id, period): total for child_id, period, total in connection.execute(
+                select(model.child_id, getattr(model, period_column), model.total))}
+            mismatched += sum(not math.isclose(stored.get(key, 0), want.get(key, 0), abs_tol=1e-6)
+                              for key in set(stored) | set(want))
+        completions = connection.execute(select(func.count()).select_from(CompletedChore)).scalar()
+    engine.dispose()
+    return dict(
+        rollup_mismatches=mismatched,
+        completions_added=completions - seeded_completions,
+        completions_acknowledged=acknowledged,
+        consistent=not mismatched and completions - seeded_completions == acknowledged,
+    )
+
+
+def run(template, seeded, workers, threads, args, weights):
+    with tempfile.TemporaryDirectory() as tmp:
+        database = os.path.join(tmp, "load.sqlite3")
+        shutil.copy(template, database)
+        port = free_port()
+        with open(os.path.join(tmp, "gunicorn.log"), "w+") as log:
+            server = start_gunicorn(database, port, workers, threads, log)
+            try:
+                samples, acknowledged, elapsed = asyncio.run(load(
+                    port, args.clients, args.users, args.duration, weights, args.children, args.chores,
+                    args.batch, args.timeout, args.seed))
+            finally:
+                server.terminate()
+                server.wait(30)
+            log.seek(0)
+            locked = log.read().count("database is locked")
+        consistency = check_totals(database, seeded, acknowledged)
+
+    failed = [s for s in samples if not isinstance(s[1], int) or s[1] >= 500]
+    return dict(
+        workers=workers,
+        threads=threads,
+        clients=args.clients,
+        requests=len(samples),
+        throughput_rps=round(len(samples) / elapsed, 1),
+        latency=summary([s[2] for s in samples]),
+        operations={name: summary([s[2] for s in samples if s[0] == name]) for name in weights},
+        errors=len(failed),
+        error_rate=round(len(failed) / len(samples), 4) if samples else 0,
+        timeouts=sum(s[1] == "timeout" for s in samples),
+        lock_errors=locked,
+        statuses={str(status): count for status, count in Counter(s[1] for s in samples).items()},
+        **consistency,
+    )
+
+
+def parse_mix(mix):
+    weights = {}
+    for part in mix.split(","):
+        name, _, weight = part.partition("=")
+        if name not in ("post", "summary", "approval"):
+            raise argparse.ArgumentTypeError(f"unknown operation {name!r}")
+        weights[name] = float(weight or 1)
+    return weights
+
+
+def parse_counts(value):
+    return [int(count) for count in value.split(",")]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP load test against a local gunicorn.")
+    parser.add_argument("--workers", type=parse_counts, default=[2], help="Comma separated, swept.")
+    parser.add_argument("--threads", type=parse_counts, default=[4], help="Comma separated, swept.")
+    parser.add_argument("--clients", type=int, default=20, help="Concurrent clients.")
+    parser.add_argument("--users", type=int, default=5, help="Users the clients log in as.")
+    parser.add_argument("--duration", type=float, default=10, help="Seconds per run.")
+    parser.add_argument("--mix", type=parse_mix, default="post=2,summary=1,approval=1")
+    parser.add_argument("--batch", type=int, default=1, help="Completions per POST.")
+    parser.add_argument("--timeout", type=float, default=30, help="Per request timeout in seconds.")
+    parser.add_argument("--children", type=int, default=20)
+    parser.add_argument("--chores", type=int, default=20)
+    parser.add_argument("--years", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the results to this JSON file.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        template = os.path.join(tmp, "template.sqlite3")
+        seeded = seed_database(template, args.children, args.chores, args.users, args.years, args.seed)
+
+        results = []
+        print(f"{'workers':>7} {'threads':>7} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+              f"{'errors':>6} {'locked':>6}  consistent")
+        for workers, threads in itertools.product(args.workers, args.threads):
+            result = run(template, seeded, workers, threads, args, args.mix)
+            results.append(result)
+            latency = result["latency"]
+            print(f"{workers:>7} {threads:>7} {result['throughput_rps']:>7} {latency['p50_ms']:>8} "
+                  f"{latency['p95_ms']:>8} {latency['p99_ms']:>8} {result['errors']:>6} "
+                  f"{result['lock_errors']:>6}  {result['consistent']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+# benchmarks/login.py
+#
+# Login throughput under concurrent load, in process.
+#
+#   python -m benchmarks.login --clients 8 --logins 20 --rounds 12 --hash-workers 2
+
+"""Login throughput and bystander page latency while clients log in concurrently."""
+
+
+import argparse
+import json
+import threading
+import time
+
+from benchmarks.common import benchmark_app, summary
+
+
+def run(clients, logins, rounds, hash_workers):
+    with benchmark_app(BCRYPT_LOG_ROUNDS=rounds) as app:
+        return run_logins(app, clients, logins, rounds, hash_workers)
+
+
+def run_logins(app, clients, logins, rounds, hash_workers):
+    from project.server import db
+    from project.server.models import User
+    from project.server.passwords import password_hasher
+
+    password_hasher.max_workers = hash_workers
+    with app.app_context():
+        db.session.add_all([User(user_name=f"user{i}", password="password") for i in range(clients)])
+        db.session.commit()
+
+    login_times, page_times = [], []
+    done = threading.Event()
+
+    def log_in(index):
+        client = app.test_client()
+        for _ in range(logins):
+            started = time.perf_counter()
+            response = client.post("/login", data=dict(user_name=f"user{index}", password="password"))
+            assert response.status_code == 302, response.status_code
+            login_times.append(time.perf_counter() - started)
+            client.get("/logout")
+
+    def browse():
+        # a bystander loading a cheap page while the logins run
+        client = app.test_client()
+        while not done.is_set():
+            started = time.perf_counter()
+            client.get("/login")
+            page_times.append(time.perf_counter() - started)
+
+    bystander = threading.Thread(target=browse)
+    bystander.start()
+    started = time.perf_counter()
+    threads = [threading.Thread(target=log_in, args=(i,)) for i in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    done.set()
+    bystander.join()
+
+    return dict(
+        clients=clients,
+        rounds=rounds,
+        hash_workers=hash_workers,
+        logins_per_second=round(len(login_times) / elapsed, 2),
+        login=summary(login_times),
+        page_during_logins=summary(page_times),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--logins", type=int, default=10, help="Logins per client.")
+    parser.add_argument("--rounds", type=int, default=12, help="BCRYPT_LOG_ROUNDS to benchmark with.")
+    parser.add_argument("--hash-workers", type=int, default=2)
+    args = parser.parse_args()
+    print(json.dumps(run(args.clients, args.logins, args.rounds, args.hash_workers), indent=2))
+
+
+if __name__ == "__main__":
+    main()
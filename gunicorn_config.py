@@ -1,3 +1,53 @@
+import glob
+import os
+import tempfile
+
 bind = "0.0.0.0:5005"
 workers = 2
+# threads keep pages flowing while bcrypt runs, see project/server/passwords.py
+threads = 4
 timeout = 120
+# import the app once in the master and fork it into the workers
+preload_app = True
+
+# every worker writes its metrics here and /metrics adds them up
+metrics_dir = os.environ.setdefault("METRICS_DIR", os.path.join(tempfile.gettempdir(), "chore_tracker_metrics"))
+# and shares rendered week views through here
+page_cache_dir = os.environ.setdefault(
+    "PAGE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "chore_tracker_page_cache"))
+
+
+def remove_files(directory, *patterns):
+    """Creates directory if needed and removes the files in it matching patterns, nothing else."""
+    os.makedirs(directory, exist_ok=True)
+    for pattern in patterns:
+        for path in glob.glob(os.path.join(directory, pattern)):
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+
+def on_starting(server):
+    from project.server.cache import PAGE_FILE_PATTERN
+
+    # counters and pages from a previous run must not leak into this one
+    remove_files(metrics_dir, "metrics_*.json", "metrics_*.json.tmp", "archived.json", "archived.json.tmp")
+    remove_files(page_cache_dir, PAGE_FILE_PATTERN, PAGE_FILE_PATTERN + ".*.tmp")
+
+
+def post_fork(server, worker):
+    # connections must not be shared with the master after a fork
+    from project.server import db
+    from wsgi import app
+
+    with app.app_context():
+        db.engine.dispose(close=False)
+
+
+def child_exit(server, worker):
+    # keep the exited worker's counters, a new worker may get its pid
+    from project.server.metrics import metrics
+    from wsgi import app  # noqa: F401, sets metrics up
+
+    metrics.archive(worker.pid)
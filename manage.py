@@ -6,27 +6,32 @@ import subprocess
 import sys
 import unittest
 
-import coverage
-from flask.cli import FlaskGroup
+import click
+
+# code coverage, only for the cov command and started before the app is
+# imported so module level code is measured
+COV = None
+if sys.argv[1:2] == ["cov"]:
+    import coverage
+
+    COV = coverage.coverage(
+        branch=True,
+        include="project/*",
+        omit=[
+            "project/tests/*",
+            "project/server/config.py",
+            "project/server/*/__init__.py",
+        ],
+    )
+    COV.start()
+
+from flask.cli import FlaskGroup  # noqa: E402
+
+from project.server import create_app, db  # noqa: E402
+from project.server.models import User  # noqa: E402
 
-from project.server import create_app, db
-from project.server.models import User
-
-app = create_app()
 cli = FlaskGroup(create_app=create_app)
 
-# code coverage
-COV = coverage.coverage(
-    branch=True,
-    include="project/*",
-    omit=[
-        "project/tests/*",
-        "project/server/config.py",
-        "project/server/*/__init__.py",
-    ],
-)
-COV.start()
-
 
 @cli.command()
 def create_db():
@@ -53,14 +58,94 @@ def drop_db():
 @cli.command()
 def create_admin():
     """Creates the admin user."""
+    from project.server.cache import reference_cache
+
     db.session.add(User(user_name="Rian", password="admin", admin=True))
+    reference_cache.invalidate("users")
     db.session.commit()
 
 
 @cli.command()
-def create_data():
+@click.option("--children", default=10, show_default=True)
+@click.option("--chores", default=20, show_default=True)
+@click.option("--users", default=5, show_default=True, type=click.IntRange(min=1))
+@click.option("--years", default=3, show_default=True, help="Years of completions, ending at --end.")
+@click.option("--per-day", default=3.0, show_default=True, help="Average completions per child per day.")
+@click.option("--skew", default=1.0, show_default=True, help="Zipf exponent for children, chores and users.")
+@click.option("--seed", default=0, show_default=True)
+@click.option("--end", type=click.DateTime(formats=["%Y-%m-%d"]), help="Last day of data, defaults to today.")
+@click.option("--batch-size", default=50000, show_default=True, help="Completions per transaction.")
+def create_data(children, chores, users, years, per_day, skew, seed, end, batch_size):
     """Creates sample data."""
-    pass
+    import time
+
+    from project.server.sample_data import generate_data
+
+    started = time.perf_counter()
+    inserted = generate_data(
+        children=children, chores=chores, users=users, years=years, per_day=per_day, skew=skew,
+        seed=seed, end=end and end.date(), batch_size=batch_size,
+        progress=lambda count: print(f"{count} completions...", end="\r"),
+    )
+    print(f"{inserted} completions for {children} children in {time.perf_counter() - started:.1f}s.")
+
+
+@cli.command("export-completions")
+@click.option("--format", "export_format", type=click.Choice(["csv", "ndjson"]), default="csv")
+@click.option("--start", type=click.DateTime(formats=["%Y-%m-%d"]), help="First day to include.")
+@click.option("--end", type=click.DateTime(formats=["%Y-%m-%d"]), help="Last day to include.")
+@click.option("--child-id", type=int, help="Only export this child.")
+@click.option("--output", type=click.File("w"), default="-", help="File to write, defaults to stdout.")
+def export_completions(export_format, start, end, child_id, output):
+    """Streams the completed chores ledger as CSV or NDJSON."""
+    from project.server.export import EXPORT_FORMATS, iter_completions
+
+    write, _ = EXPORT_FORMATS[export_format]
+    rows = iter_completions(start=start and start.date(), end=end and end.date(), child_id=child_id)
+    for chunk in write(rows):
+        output.write(chunk)
+
+
+@cli.command("rebuild-totals")
+@click.option("--workers", default=4, show_default=True, help="Processes aggregating the ledger.")
+@click.option("--apply", "apply_changes", is_flag=True, help="Write the corrections back.")
+def rebuild_totals(workers, apply_changes):
+    """Recomputes weekly, monthly and yearly totals from the ledger."""
+    from project.server.reconcile import (
+        apply_corrections,
+        expected_totals,
+        find_mismatches,
+        format_mismatch,
+        ledger_daily_sums,
+    )
+
+    mismatches = find_mismatches(expected_totals(ledger_daily_sums(workers=workers)))
+    for mismatch in mismatches:
+        print(format_mismatch(mismatch))
+    print(f"{len(mismatches)} mismatched totals.")
+    if mismatches and apply_changes:
+        apply_corrections(mismatches)
+        print("Corrections applied.")
+
+
+@cli.command("startup-profile")
+@click.option("--target", default="wsgi:app", show_default=True, help="Module and app (or factory) to boot.")
+@click.option("--path", default="/login", show_default=True, help="Path of the first request.")
+@click.option("--top", default=15, show_default=True, help="Number of slowest imports to list.")
+def startup_profile(target, path, top):
+    """Reports import times and time to first request for a fresh worker."""
+    from project.server.profiling import import_times, time_to_first_request
+
+    times = import_times(target.partition(":")[0])
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    for module, self_us, cumulative_us in sorted(times, key=lambda t: t[2], reverse=True)[:top]:
+        print(f"{cumulative_us / 1000:14.1f} {self_us / 1000:9.1f}  {module}")
+    print(f"{len(times)} modules imported.")
+
+    timings = time_to_first_request(target, path)
+    print(f"import {timings['imported'] * 1000:.0f} ms, create app {timings['created'] * 1000:.0f} ms, "
+          f"first request {timings['first_request'] * 1000:.0f} ms (status {timings['status']}), "
+          f"total {timings['total'] * 1000:.0f} ms")
 
 
 @cli.command()
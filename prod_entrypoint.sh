@@ -1,3 +1,4 @@
 #!/bin/sh
 
-exec gunicorn --config gunicorn_config.py manage:app
\ No newline at end of file
+python manage.py build-assets
+exec gunicorn --config gunicorn_config.py wsgi:app
\ No newline at end of file
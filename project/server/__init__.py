@@ -6,18 +6,27 @@ import os
 from flask import Flask, render_template
 from flask_bcrypt import Bcrypt
 from flask_bootstrap import Bootstrap4
-from flask_debugtoolbar import DebugToolbarExtension
 from flask_login import LoginManager
-from flask_migrate import Migrate
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event
 
 # instantiate the extensions
 login_manager = LoginManager()
 bcrypt = Bcrypt()
-toolbar = DebugToolbarExtension()
 bootstrap = Bootstrap4()
 db = SQLAlchemy()
-migrate = Migrate()
+
+
+def sqlite_pragmas(pragmas):
+    """Connect-event hook running the configured PRAGMAs on each new SQLite connection."""
+
+    def on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f"PRAGMA {name}={value}")
+        cursor.close()
+
+    return on_connect
 
 
 def create_app(script_info=None):
@@ -38,27 +47,56 @@ def create_app(script_info=None):
     # set up extensions
     login_manager.init_app(app)
     bcrypt.init_app(app)
-    toolbar.init_app(app)
     bootstrap.init_app(app)
     db.init_app(app)
-    migrate.init_app(app, db)
+
+    # migrations (and alembic) are only needed by the flask cli
+    if os.getenv("FLASK_RUN_FROM_CLI"):
+        from flask_migrate import Migrate
+
+        Migrate(app, db)
+
+    # dev-only extensions are imported only when the config turns them on
+    if app.config.get("DEBUG_TB_ENABLED"):
+        from flask_debugtoolbar import DebugToolbarExtension
+
+        DebugToolbarExtension(app)
+
+    # sqlite connection tuning
+    with app.app_context():
+        if db.engine.dialect.name == "sqlite" and app.config.get("SQLITE_PRAGMAS"):
+            event.listen(db.engine, "connect", sqlite_pragmas(app.config["SQLITE_PRAGMAS"]))
+
+    from project.server.assets import static_assets
+    from project.server.cache import page_cache, reference_cache, user_cache
+    from project.server.metrics import metrics
+    from project.server.passwords import password_hasher
+    from project.server.timing import request_timing
+
+    request_timing.init_app(app)
+    metrics.init_app(app)
+    reference_cache.init_app(app)
+    user_cache.init_app(app)
+    page_cache.init_app(app)
+    password_hasher.init_app(app)
+    static_assets.init_app(app)
 
     # register blueprints
+    from project.server.api.views import api_blueprint
     from project.server.main.views import main_blueprint
     from project.server.user.views import user_blueprint
 
     app.register_blueprint(user_blueprint)
     app.register_blueprint(main_blueprint)
+    app.register_blueprint(api_blueprint)
 
     # flask login
-    from project.server.models import User
-
     login_manager.login_view = "user.login"
     login_manager.login_message_category = "danger"
 
     @login_manager.user_loader
     def load_user(user_id):
-        return User.query.filter(User.id == int(user_id)).first()
+        return user_cache.load(int(user_id))
 
     # error handlers
     @app.errorhandler(401)
@@ -77,6 +115,17 @@ def create_app(script_info=None):
     def server_error_page(error):
         return render_template("errors/500.html"), 500
 
+    # no proxy compresses for us, see project/server/compression.py
+    if app.config.get("COMPRESS_RESPONSES"):
+        from project.server.compression import ResponseCompression
+
+        app.wsgi_app = ResponseCompression(
+            app.wsgi_app,
+            mimetypes=app.config["COMPRESS_MIMETYPES"],
+            min_size=app.config["COMPRESS_MIN_SIZE"],
+            level=app.config["COMPRESS_LEVEL"],
+        )
+
     # shell context for flask cli
     @app.shell_context_processor
     def ctx():
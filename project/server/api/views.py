@@ -0,0 +1,208 @@
+# project/server/api/views.py
+
+
+import json
+from datetime import date, datetime, timedelta
+
+from flask import Blueprint, abort, current_app, jsonify, request
+from flask_login import current_user, login_required
+
+from project.server import db
+from project.server.cache import get_children, get_chores
+from project.server.main.views import (
+    get_week_completions,
+    get_week_versions,
+    get_weekly_totals,
+    not_modified,
+    parse_history_args,
+    week_validators,
+    with_validators,
+)
+from project.server.models import Child, MonthlyTotals, YearlyTotals
+from project.server.services import completion_history, record_completions
+from project.server.user.views import get_week_approvals
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+api_blueprint = Blueprint("api", __name__, url_prefix="/api")
+
+
+def json_response(payload, status=200):
+    """Compact JSON, serialized by orjson when it is installed."""
+    if orjson is not None:
+        body = orjson.dumps(payload)
+    else:
+        body = json.dumps(payload, separators=(",", ":"))
+    return current_app.response_class(body, status=status, mimetype="application/json")
+
+
+def parse_completion(item, child_ids, chore_values):
+    """Validates one batch item, returning (entry, error)."""
+    if not isinstance(item, dict):
+        return None, "expected an object"
+    child_id, chore_id = item.get("child_id"), item.get("chore_id")
+    # bool is an int subclass, JSON true would be child 1
+    if type(child_id) is not int or child_id not in child_ids:
+        return None, "unknown child_id"
+    if type(chore_id) is not int or chore_id not in chore_values:
+        return None, "unknown chore_id"
+    try:
+        completed_on = date.fromisoformat(item["completed_on"]) if item.get("completed_on") else date.today()
+    except (TypeError, ValueError):
+        return None, "completed_on must be YYYY-MM-DD"
+    return dict(child_id=child_id, chore_id=chore_id, completed_on=completed_on,
+                value=chore_values[chore_id]), None
+
+
+@api_blueprint.route("/completions", methods=["POST"])
+@login_required
+def add_completions():
+    items = request.get_json(silent=True)
+    if not isinstance(items, list):
+        return jsonify(error="expected a JSON array of completions"), 400
+    if len(items) > current_app.config["API_MAX_BATCH"]:
+        return jsonify(error=f"at most {current_app.config['API_MAX_BATCH']} completions per request"), 413
+
+    child_ids = {c.id for c in get_children()}
+    chore_values = {c.id: c.value for c in get_chores()}
+
+    results = []
+    entries = []
+    for index, item in enumerate(items):
+        entry, error = parse_completion(item, child_ids, chore_values)
+        if error:
+            results.append(dict(index=index, status="error", error=error))
+        else:
+            results.append(dict(index=index, status="created"))
+            entries.append(entry)
+
+    created = record_completions(entries, current_user.id)
+    return jsonify(created=created, failed=len(items) - created, results=results), 201 if created else 400
+
+
+def completion_json(completion):
+    return dict(
+        id=completion.id,
+        completed_on=completion.completed_on.isoformat(),
+        child_id=completion.child_id,
+        child=completion.child.name,
+        chore_id=completion.chore_id,
+        chore=completion.chore.chore,
+        value=completion.value,
+        user=completion.user.user_name,
+    )
+
+
+@api_blueprint.route("/completions", methods=["GET"])
+@login_required
+def list_completions():
+    completions, next_cursor = completion_history(**parse_history_args(request.args))
+    return jsonify(completions=[completion_json(c) for c in completions], next=next_cursor)
+
+
+@api_blueprint.route("/totals/<period>")
+@login_required
+def rollup_totals(period):
+    """Per-child monthly or yearly totals read from the rollup tables."""
+    year = request.args.get("year", type=int)
+    child_id = request.args.get("child_id", type=int)
+    if period == "monthly":
+        model, period_column = MonthlyTotals, MonthlyTotals.month_start
+    elif period == "yearly":
+        model, period_column = YearlyTotals, YearlyTotals.year
+    else:
+        abort(404)
+
+    query = db.session.query(model.child_id, Child.name, period_column, model.total).join(
+        Child, Child.id == model.child_id
+    )
+    if year and model is YearlyTotals:
+        query = query.filter(YearlyTotals.year == year)
+    elif year:
+        query = query.filter(MonthlyTotals.month_start >= date(year, 1, 1),
+                             MonthlyTotals.month_start < date(year + 1, 1, 1))
+    if child_id:
+        query = query.filter(model.child_id == child_id)
+
+    totals = [
+        dict(child_id=row[0], child=row[1],
+             period=row[2].isoformat() if isinstance(row[2], date) else row[2], total=row[3])
+        for row in query.order_by(period_column, Child.name)
+    ]
+    return jsonify(period=period, totals=totals)
+
+
+def parse_week(start):
+    """The week's first day as a datetime, like the pages use, aborting on bad input."""
+    try:
+        return datetime.strptime(start, "%Y-%m-%d")
+    except ValueError:
+        abort(json_response(dict(error="start must be YYYY-MM-DD"), 400))
+
+
+def week_response(start_of_week, build, *extra):
+    """Answers a conditional GET for a week, or builds its JSON body.
+
+    Validated like the summary and approval pages, so a polling client gets
+    a 304 after one version lookup until the week changes.
+    """
+    validators = week_validators(start_of_week, get_week_versions(start_of_week), *extra)
+    response = not_modified(*validators)
+    if response is not None:
+        return response
+    return with_validators(json_response(build()), *validators)
+
+
+@api_blueprint.route("/weeks/<start>/summary")
+@login_required
+def week_summary(start):
+    """Per-child totals and completions for the seven days from start."""
+    start_of_week = parse_week(start)
+    end_of_week = start_of_week + timedelta(days=6, hours=23, minutes=59, seconds=59)
+
+    def build():
+        totals = get_weekly_totals(start_of_week, end_of_week)
+        completions = get_week_completions(start_of_week, end_of_week)
+        return dict(
+            week_start=start_of_week.date().isoformat(),
+            week_end=end_of_week.date().isoformat(),
+            totals=[dict(child_id=child_id, child=name, total=total) for child_id, (name, total) in totals.items()],
+            completions=[dict(
+                id=c.id,
+                completed_on=c.completed_on.isoformat(),
+                child_id=c.child_id,
+                child=c.child.name,
+                chore_id=c.chore_id,
+                chore=c.chore.chore,
+                value=c.value,
+            ) for c in completions],
+        )
+
+    return week_response(start_of_week, build)
+
+
+@api_blueprint.route("/weeks/<start>/approvals")
+@login_required
+def week_approvals(start):
+    """Each child's total for the week starting on start and who approved it."""
+    if not current_user.admin:
+        return json_response(dict(error="admin only"), 403)
+    start_of_week = parse_week(start)
+
+    def build():
+        return dict(
+            week_start=start_of_week.date().isoformat(),
+            approvals=[dict(
+                child_id=row.child_id,
+                child=row.child_name,
+                total=row.total,
+                approved=row.approved_on is not None,
+                approved_by=row.approver_name,
+                approved_on=row.approved_on.isoformat() if row.approved_on else None,
+            ) for row in get_week_approvals(start_of_week)],
+        )
+
+    return week_response(start_of_week, build)
@@ -0,0 +1,188 @@
+# project/server/assets.py
+
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+
+import click
+from flask import current_app, request, send_from_directory
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# files worth compressing, anything else is only fingerprinted
+COMPRESSIBLE = (".css", ".js", ".json", ".svg", ".txt", ".html", ".map")
+# (Content-Encoding, file suffix) in order of preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+# where builds go inside the static folder unless ASSETS_DIR says otherwise
+DEFAULT_BUILD_DIR = "dist"
+
+
+def build_assets(static_folder, output_dir):
+    """Writes content hashed copies of the static files to output_dir.
+
+    Each compressible file also gets a ``.gz`` variant and, with the brotli
+    package installed, a ``.br`` one, kept only where they are smaller. The
+    manifest maps every source name to its hashed name and encodings.
+    Files of a previous build, as listed in its manifest, are removed and
+    nothing else in output_dir is touched. Raises ValueError if output_dir
+    is static_folder or one of its parents. Returns the manifest.
+    """
+    static_folder, output_dir = os.path.realpath(static_folder), os.path.realpath(output_dir)
+    if os.path.commonpath([static_folder, output_dir]) == output_dir:
+        raise ValueError(f"{output_dir} holds the static folder, build into a directory of its own")
+    remove_build(output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = {}
+    # a leftover default build is not a source either
+    builds = {output_dir, os.path.join(static_folder, DEFAULT_BUILD_DIR)}
+    for root, dirs, files in os.walk(static_folder):
+        dirs[:] = sorted(d for d in dirs if os.path.join(root, d) not in builds)
+        for name in sorted(files):
+            source = os.path.join(root, name)
+            filename = os.path.relpath(source, static_folder).replace(os.sep, "/")
+            with open(source, "rb") as f:
+                data = f.read()
+            stem, ext = os.path.splitext(filename)
+            hashed = f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+            target = os.path.join(output_dir, hashed)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target, "wb") as f:
+                f.write(data)
+
+            encodings = []
+            if ext in COMPRESSIBLE:
+                variants = {"gzip": gzip.compress(data, 9, mtime=0)}
+                if brotli is not None:
+                    variants["br"] = brotli.compress(data, quality=11)
+                for encoding, suffix in ENCODINGS:
+                    if encoding in variants and len(variants[encoding]) < len(data):
+                        with open(target + suffix, "wb") as f:
+                            f.write(variants[encoding])
+                        encodings.append(encoding)
+            manifest[filename] = dict(path=hashed, encodings=encodings)
+
+    with open(os.path.join(output_dir, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def folder_digest(folder):
+    """A short hash of every file's name and contents under folder."""
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(folder):
+        dirs.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            digest.update(os.path.relpath(path, folder).encode())
+            with open(path, "rb") as f:
+                digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+def remove_build(output_dir):
+    """Removes the files listed in output_dir's manifest, the manifest and the directories they leave empty."""
+    try:
+        with open(os.path.join(output_dir, "manifest.json")) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return
+    paths = []
+    for entry in manifest.values():
+        target = os.path.realpath(os.path.join(output_dir, entry["path"]))
+        if os.path.commonpath([output_dir, target]) != output_dir:
+            continue
+        paths.append(target)
+        paths.extend(target + suffix for encoding, suffix in ENCODINGS if encoding in entry["encodings"])
+    for path in paths + [os.path.join(output_dir, "manifest.json")]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+    # deepest first, so parents are empty by the time they come up
+    for directory in sorted({os.path.dirname(path) for path in paths}, key=len, reverse=True):
+        while directory != output_dir and os.path.isdir(directory) and not os.listdir(directory):
+            os.rmdir(directory)
+            directory = os.path.dirname(directory)
+
+
+class StaticAssets(object):
+    """Fingerprinted, precompressed static files.
+
+    ``flask build-assets`` writes hashed copies of the static folder to
+    ASSETS_DIR (``dist`` inside it by default). Once they are there,
+    ``url_for('static', ...)`` points at the hashed copy, which is served
+    with its brotli or gzip variant when the client accepts one and cached
+    for a year as immutable. Without a build, static files are served as
+    before.
+    """
+
+    def __init__(self):
+        self.directory = None
+        self.manifest = {}
+        self.version = ""
+        self._hashed = {}
+
+    def init_app(self, app):
+        default = os.path.join(app.static_folder, DEFAULT_BUILD_DIR)
+        self.directory = os.path.normpath(app.config.get("ASSETS_DIR") or default)
+        if not app.config.get("BUILD_ID"):
+            app.config["BUILD_ID"] = folder_digest(os.path.join(app.root_path, app.template_folder))
+        app.view_functions["static"] = self.send_static
+        app.url_defaults(self._hashed_url)
+        self.load()
+
+        @app.cli.command("build-assets")
+        def build_assets_command():
+            """Fingerprints and precompresses the static files."""
+            try:
+                manifest = build_assets(app.static_folder, self.directory)
+            except ValueError as error:
+                raise click.ClickException(str(error))
+            self.load()
+            click.echo(f"Built {len(manifest)} assets in {self.directory}")
+            if brotli is None:
+                click.echo("brotli is not installed, only gzip variants were written")
+
+    def load(self):
+        """Reads the manifest written by build_assets(), if there is one."""
+        try:
+            with open(os.path.join(self.directory, "manifest.json")) as f:
+                self.manifest = json.load(f)
+        except (OSError, ValueError):
+            self.manifest = {}
+        self._hashed = {entry["path"]: entry["encodings"] for entry in self.manifest.values()}
+        # changes with every build that changes an asset, for validators of pages linking them
+        self.version = hashlib.sha256(json.dumps(self.manifest, sort_keys=True).encode()).hexdigest()[:12]
+
+    def _hashed_url(self, endpoint, values):
+        if endpoint == "static" and values.get("filename") in self.manifest:
+            values["filename"] = f"_/{self.manifest[values['filename']]['path']}"
+
+    def send_static(self, filename):
+        if not filename.startswith("_/") or filename[2:] not in self._hashed:
+            return current_app.send_static_file(filename)
+        filename = filename[2:]
+        encoding, suffix = next(
+            ((encoding, suffix) for encoding, suffix in ENCODINGS
+             if encoding in self._hashed[filename] and request.accept_encodings[encoding]),
+            (None, ""),
+        )
+        response = send_from_directory(self.directory, filename + suffix,
+                                       mimetype=mimetypes.guess_type(filename)[0], max_age=IMMUTABLE_MAX_AGE)
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+            # named after the variant otherwise
+            response.headers.pop("Content-Disposition", None)
+        response.vary.add("Accept-Encoding")
+        response.cache_control.immutable = True
+        return response
+
+
+static_assets = StaticAssets()
@@ -0,0 +1,287 @@
+# project/server/cache.py
+
+
+import glob
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+from flask import g, session
+from flask_login import UserMixin
+from sqlalchemy import update
+
+from project.server import db
+from project.server.models import CacheVersion, Child, Chore, User
+
+ChildRef = namedtuple("ChildRef", ["id", "name"])
+ChoreRef = namedtuple("ChoreRef", ["id", "chore", "value"])
+UserRef = namedtuple("UserRef", ["id", "user_name", "admin"])
+
+
+class ReferenceCache(object):
+    """Per-worker LRU cache of small reference tables.
+
+    Every entry is stamped with the version it was loaded at. The shared
+    versions live in the ``cache_versions`` table and are read once per
+    request, so a write in one gunicorn worker is seen by the others on
+    their next request without reloading anything that did not change.
+    """
+
+    def __init__(self, maxsize=32):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.maxsize = app.config.get("REFERENCE_CACHE_SIZE", self.maxsize)
+        app.before_request(self._reset_versions)
+
+    def _reset_versions(self):
+        g.pop("_reference_versions", None)
+
+    def _versions(self):
+        if "_reference_versions" not in g:
+            g._reference_versions = dict(db.session.query(CacheVersion.name, CacheVersion.version).all())
+        return g._reference_versions
+
+    def get(self, name, loader):
+        version = self._versions().get(name, 0)
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is not None and entry[0] == version:
+                self._entries.move_to_end(name)
+                return entry[1]
+        value = loader()
+        with self._lock:
+            self._entries[name] = (version, value)
+            self._entries.move_to_end(name)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, *names):
+        """Bumps the shared version of each name in the current transaction."""
+        for name in names:
+            bumped = db.session.execute(
+                update(CacheVersion).where(CacheVersion.name == name).values(version=CacheVersion.version + 1)
+            ).rowcount
+            if not bumped:
+                db.session.add(CacheVersion(name=name, version=1))
+            with self._lock:
+                self._entries.pop(name, None)
+        g.pop("_reference_versions", None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+reference_cache = ReferenceCache()
+
+
+class CachedUser(UserMixin, namedtuple("CachedUser", ["id", "user_name", "admin", "session_version"])):
+    """What a request needs to know about current_user, without a row."""
+
+    __slots__ = ()
+
+
+class UserCache(object):
+    """Per-worker cache of logged in users for the Flask-Login user loader.
+
+    Entries live for USER_CACHE_TTL seconds. The session carries the
+    ``session_version`` the user was loaded at, so a session stamped with a
+    different version than the cached entry reloads it straight away.
+    Writes in this worker call invalidate(); other workers catch up on the
+    stamp or the TTL.
+    """
+
+    session_key = "_user_version"
+
+    def __init__(self, ttl=60, maxsize=1024):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self.ttl = app.config.get("USER_CACHE_TTL", self.ttl)
+        self.maxsize = app.config.get("USER_CACHE_SIZE", self.maxsize)
+
+    def load(self, user_id):
+        stamp = session.get(self.session_key)
+        with self._lock:
+            entry = self._entries.get(user_id)
+        if entry is not None:
+            loaded_at, user = entry
+            if stamp not in (None, user.session_version):
+                # the user changed since this entry was loaded, never hand it out again
+                self.invalidate(user_id)
+            elif time.monotonic() - loaded_at < self.ttl:
+                return user
+        row = db.session.query(
+            User.id, User.user_name, User.admin, User.session_version
+        ).filter(User.id == user_id).first()
+        if row is None:
+            self.invalidate(user_id)
+            return None
+        return self.remember(CachedUser(*row))
+
+    def remember(self, user):
+        """Caches user and stamps the session with its version."""
+        user = CachedUser(user.id, user.user_name, user.admin, user.session_version)
+        with self._lock:
+            self._entries[user.id] = (time.monotonic(), user)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        if session.get(self.session_key) != user.session_version:
+            session[self.session_key] = user.session_version
+        return user
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_cache = UserCache()
+
+
+# the file of a page cache entry, named after a sha1 of its key
+PAGE_FILE_PATTERN = "[0-9a-f]" * 40 + ".json"
+
+
+class PageCache(object):
+    """LRU cache of rendered week views, shared by workers through files.
+
+    Entries are keyed by (endpoint, week_start, role) and stamped with a
+    token made from the week versions, see bump_week_versions(). A write to
+    a week changes its token, so every worker renders it again on its next
+    request, while approved weeks never change and stay until evicted.
+
+    The first PAGE_CACHE_SIZE entries are kept in memory. With
+    PAGE_CACHE_DIR set, entries are also written there for the other
+    workers, keeping the PAGE_CACHE_FILES most recently used files.
+    PAGE_CACHE_SIZE 0 turns the cache off.
+    """
+
+    def __init__(self, maxsize=256, max_files=4096):
+        self.maxsize = maxsize
+        self.max_files = max_files
+        self.directory = None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def init_app(self, app):
+        self.maxsize = app.config.get("PAGE_CACHE_SIZE", self.maxsize)
+        self.max_files = app.config.get("PAGE_CACHE_FILES", self.max_files)
+        self.directory = app.config.get("PAGE_CACHE_DIR")
+        if self.directory and self.maxsize:
+            os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key):
+        name = hashlib.sha1(json.dumps(key).encode()).hexdigest()
+        return os.path.join(self.directory, f"{name}.json")
+
+    def get(self, key, token):
+        """The value cached for key at token, or None."""
+        if not self.maxsize:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == token:
+                self._entries.move_to_end(key)
+                return entry[1]
+        if not self.directory:
+            return None
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if stored["key"] != list(key) or stored["token"] != token:
+            return None
+        try:
+            # keeps the file out of the next prune
+            os.utime(path)
+        except OSError:
+            pass
+        self._remember(key, token, stored["value"])
+        return stored["value"]
+
+    def set(self, key, token, value):
+        """Caches a JSON serializable value for key at token."""
+        if not self.maxsize:
+            return
+        self._remember(key, token, value)
+        if not self.directory:
+            return
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(dict(key=list(key), token=token, value=value), f)
+        os.replace(tmp, path)
+        self._writes += 1
+        if self._writes % 64 == 0:
+            self.prune()
+
+    def _remember(self, key, token, value):
+        with self._lock:
+            self._entries[key] = (token, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def prune(self):
+        """Removes the least recently used files over PAGE_CACHE_FILES."""
+        files = []
+        for path in glob.glob(os.path.join(self.directory, PAGE_FILE_PATTERN)):
+            try:
+                files.append((os.path.getmtime(path), path))
+            except OSError:
+                pass
+        for _, path in sorted(files)[:max(len(files) - self.max_files, 0)]:
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+        if self.directory:
+            for path in glob.glob(os.path.join(self.directory, PAGE_FILE_PATTERN)):
+                try:
+                    os.remove(path)
+                except OSError:
+                    # another worker cleared it first
+                    pass
+
+
+page_cache = PageCache()
+
+
+def get_children():
+    return reference_cache.get("children", lambda: [
+        ChildRef(*row) for row in db.session.query(Child.id, Child.name).order_by(Child.id)
+    ])
+
+
+def get_chores():
+    return reference_cache.get("chores", lambda: [
+        ChoreRef(*row) for row in db.session.query(Chore.id, Chore.chore, Chore.value).order_by(Chore.id)
+    ])
+
+
+def get_users():
+    return reference_cache.get("users", lambda: [
+        UserRef(*row) for row in db.session.query(User.id, User.user_name, User.admin).order_by(User.id)
+    ])
@@ -0,0 +1,131 @@
+# project/server/compression.py
+
+
+import zlib
+
+from werkzeug.datastructures import Headers
+from werkzeug.http import parse_accept_header
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# statuses that never carry a body
+NO_BODY = ("1", "204", "304")
+
+
+class GzipEncoder(object):
+    def __init__(self, level):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        # a sync flush sends every chunk on straight away, so streams keep streaming
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class BrotliEncoder(object):
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class ResponseCompression(object):
+    """WSGI middleware compressing text responses on the fly.
+
+    Negotiates brotli (when the package is installed) or gzip from
+    Accept-Encoding for responses whose type is in COMPRESS_MIMETYPES and
+    that are not already encoded. Responses with a Content-Length below
+    COMPRESS_MIN_SIZE go out as they are. Bodies are compressed chunk by
+    chunk as the app yields them, so streamed responses are never buffered.
+    """
+
+    def __init__(self, wsgi_app, mimetypes, min_size=500, level=6, brotli_quality=4):
+        self.wsgi_app = wsgi_app
+        self.mimetypes = frozenset(mimetypes)
+        self.min_size = min_size
+        self.level = level
+        self.brotli_quality = brotli_quality
+
+    def negotiate(self, environ):
+        """The encoding to use for this request, or None."""
+        if environ.get("REQUEST_METHOD") == "HEAD":
+            return None
+        accepted = parse_accept_header(environ.get("HTTP_ACCEPT_ENCODING", ""))
+        if brotli is not None and accepted["br"]:
+            return "br"
+        if accepted["gzip"]:
+            return "gzip"
+        return None
+
+    def compressible(self, headers):
+        return headers.get("Content-Type", "").split(";")[0].strip().lower() in self.mimetypes
+
+    def should_compress(self, status, headers):
+        if status.startswith(NO_BODY) or status.startswith("206"):
+            return False
+        if "Content-Encoding" in headers or "no-transform" in headers.get("Cache-Control", ""):
+            return False
+        length = headers.get("Content-Length", type=int)
+        return length is None or length >= self.min_size
+
+    def encoder(self, encoding):
+        if encoding == "br":
+            return BrotliEncoder(self.brotli_quality)
+        return GzipEncoder(self.level)
+
+    def __call__(self, environ, start_response):
+        encoding = self.negotiate(environ)
+        if encoding is None:
+            return self.wsgi_app(environ, start_response)
+
+        state = {}
+
+        def compressing_start_response(status, response_headers, exc_info=None):
+            headers = Headers(response_headers)
+            state["started"] = True
+            if self.compressible(headers):
+                if "accept-encoding" not in headers.get("Vary", "").lower():
+                    headers["Vary"] = ", ".join(filter(None, [headers.get("Vary"), "Accept-Encoding"]))
+                if self.should_compress(status, headers):
+                    state["encoder"] = self.encoder(encoding)
+                    headers["Content-Encoding"] = encoding
+                    headers.pop("Content-Length", None)
+                    headers.pop("Accept-Ranges", None)
+                    etag = headers.get("ETag")
+                    if etag and not etag.startswith("W/"):
+                        # the encoded bytes differ, so the tag can only be weak
+                        headers["ETag"] = f"W/{etag}"
+            write = start_response(status, headers.to_wsgi_list(), exc_info)
+            if "encoder" not in state:
+                return write
+            return lambda data: write(state["encoder"].compress(data))
+
+        app_iter = self.wsgi_app(environ, compressing_start_response)
+        if state.get("started") and "encoder" not in state:
+            # keeps wsgi.file_wrapper and friends intact
+            return app_iter
+        return self._body(app_iter, state)
+
+    def _body(self, app_iter, state):
+        # apps may call start_response on their first chunk, so state is read per chunk
+        try:
+            for chunk in app_iter:
+                encoder = state.get("encoder")
+                if encoder is None:
+                    yield chunk
+                elif chunk:
+                    yield encoder.compress(chunk)
+            if "encoder" in state:
+                yield state["encoder"].finish()
+        finally:
+            if hasattr(app_iter, "close"):
+                app_iter.close()
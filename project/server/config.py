@@ -3,19 +3,65 @@
 import os
 
 basedir = os.path.abspath(os.path.dirname(__file__))
-print(f"basedir: {basedir}")
 
 
 class BaseConfig(object):
     """Base configuration."""
 
+    API_MAX_BATCH = 500
     APP_NAME = os.getenv("APP_NAME", "chore_tracker")
+    # written by `flask build-assets`, defaults to dist in the static folder
+    ASSETS_DIR = os.getenv("ASSETS_DIR")
     BCRYPT_LOG_ROUNDS = 4
+    # names the deployed code in page ETags, defaults to a hash of the templates
+    BUILD_ID = os.getenv("BUILD_ID")
+    # gzip or brotli for text responses, see project/server/compression.py
+    COMPRESS_LEVEL = 6
+    COMPRESS_MIMETYPES = (
+        "application/javascript",
+        "application/json",
+        "application/x-ndjson",
+        "image/svg+xml",
+        "text/css",
+        "text/csv",
+        "text/html",
+        "text/javascript",
+        "text/plain",
+    )
+    COMPRESS_MIN_SIZE = 500
+    COMPRESS_RESPONSES = os.getenv("COMPRESS_RESPONSES", "1").lower() in ("1", "true", "yes")
     DEBUG_TB_ENABLED = False
+    HISTORY_MAX_PAGE_SIZE = 200
+    HISTORY_PAGE_SIZE = 50
+    # shared by all worker processes for /metrics, see project/server/metrics.py
+    METRICS_DIR = os.getenv("METRICS_DIR")
+    METRICS_FLUSH_SECONDS = 1.0
+    # rendered week views, see project/server/cache.py
+    PAGE_CACHE_DIR = os.getenv("PAGE_CACHE_DIR")
+    PAGE_CACHE_FILES = 4096
+    PAGE_CACHE_SIZE = int(os.getenv("PAGE_CACHE_SIZE", 256))
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 2))
+    REFERENCE_CACHE_SIZE = 32
+    # one JSON line per request on the app logger, see project/server/timing.py
+    REQUEST_LOG = os.getenv("REQUEST_LOG", "1").lower() in ("1", "true", "yes")
     SECRET_KEY = os.getenv("SECRET_KEY", "my_precious")
+    SERVER_TIMING = os.getenv("SERVER_TIMING", "1").lower() in ("1", "true", "yes")
+    SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", 100))
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    TESTING = False
+    # applied to every new SQLite connection, see create_app()
+    SQLITE_PRAGMAS = {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "busy_timeout": int(os.getenv("SQLITE_BUSY_TIMEOUT", 5000)),
+        "mmap_size": int(os.getenv("SQLITE_MMAP_SIZE", 256 * 1024 * 1024)),
+        "cache_size": int(os.getenv("SQLITE_CACHE_SIZE", -64000)),
+        "temp_store": "MEMORY",
+    }
+    USER_CACHE_SIZE = 1024
+    USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", 60))
     WTF_CSRF_ENABLED = False
-    SQLALCHEMY_ECHO = True
+    SQLALCHEMY_ECHO = os.getenv("SQLALCHEMY_ECHO", "0").lower() in ("1", "true", "yes")
 
 
 class DevelopmentConfig(BaseConfig):
@@ -26,12 +72,16 @@ class DevelopmentConfig(BaseConfig):
     SQLALCHEMY_DATABASE_URI = os.getenv(
         "DATABASE_URL", "sqlite:///{0}".format(os.path.join(basedir, "data", "chores_db.sqlite3"))
     )
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_pre_ping": True,
+    }
 
 
 class TestingConfig(BaseConfig):
     """Testing configuration."""
 
     PRESERVE_CONTEXT_ON_EXCEPTION = False
+    REQUEST_LOG = False
     SQLALCHEMY_DATABASE_URI = "sqlite:///"
     SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_TEST_URL", "sqlite:///")
     TESTING = True
@@ -45,4 +95,11 @@ class ProductionConfig(BaseConfig):
         "PROD_DATABASE_URL",
         "sqlite:///{0}".format(os.path.join(basedir, "data", "prod_chores_db.sqlite3")),
     )
+    SQLALCHEMY_ENGINE_OPTIONS = {
+        "pool_size": int(os.getenv("DB_POOL_SIZE", 5)),
+        "max_overflow": int(os.getenv("DB_MAX_OVERFLOW", 5)),
+        "pool_timeout": 30,
+        "pool_recycle": 3600,
+        "pool_pre_ping": True,
+    }
     WTF_CSRF_ENABLED = True
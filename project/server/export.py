@@ -0,0 +1,79 @@
+# project/server/export.py
+
+
+import csv
+import io
+import json
+
+from sqlalchemy import select
+
+from project.server import db
+from project.server.models import Child, Chore, CompletedChore, User
+
+EXPORT_COLUMNS = ["id", "completed_on", "child_id", "child", "chore_id", "chore", "value", "user"]
+
+
+def completions_query(start=None, end=None, child_id=None):
+    """Completions joined with child, chore and user names, oldest first."""
+    query = select(
+        CompletedChore.id,
+        CompletedChore.completed_on,
+        CompletedChore.child_id,
+        Child.name,
+        CompletedChore.chore_id,
+        Chore.chore,
+        CompletedChore.value,
+        User.user_name,
+    ).join(
+        Child, Child.id == CompletedChore.child_id
+    ).join(
+        Chore, Chore.id == CompletedChore.chore_id
+    ).join(
+        User, User.id == CompletedChore.user_id
+    ).order_by(CompletedChore.completed_on, CompletedChore.id)
+    if start:
+        query = query.where(CompletedChore.completed_on >= start)
+    if end:
+        query = query.where(CompletedChore.completed_on <= end)
+    if child_id:
+        query = query.where(CompletedChore.child_id == child_id)
+    return query
+
+
+def iter_completions(start=None, end=None, child_id=None, batch_size=1000):
+    """Streams export rows through a server-side cursor, batch_size at a time."""
+    query = completions_query(start, end, child_id).execution_options(yield_per=batch_size)
+    for row in db.session.execute(query):
+        yield row
+
+
+def iter_csv(rows, batch_size=1000):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for count, row in enumerate(rows, 1):
+        writer.writerow(row)
+        if count % batch_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def iter_ndjson(rows, batch_size=1000):
+    lines = []
+    for row in rows:
+        record = dict(zip(EXPORT_COLUMNS, row))
+        record["completed_on"] = record["completed_on"].isoformat()
+        lines.append(json.dumps(record))
+        if len(lines) == batch_size:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+EXPORT_FORMATS = {
+    "csv": (iter_csv, "text/csv"),
+    "ndjson": (iter_ndjson, "application/x-ndjson"),
+}
@@ -1,13 +1,34 @@
 # project/server/main/views.py
 
 
-from datetime import datetime, timedelta
-
-from flask import Blueprint, flash, redirect, render_template, request, url_for
+import hashlib
+from datetime import datetime, timedelta, timezone
+
+from flask import (
+    Blueprint,
+    current_app,
+    Response,
+    abort,
+    flash,
+    make_response,
+    redirect,
+    render_template,
+    request,
+    session,
+    stream_with_context,
+    url_for,
+)
 from flask_login import current_user, login_required
+from markupsafe import Markup
+from sqlalchemy import func
+from sqlalchemy.orm import joinedload
 
 from project.server import db
-from project.server.models import Child, Chore, CompletedChore, WeeklyTotals
+from project.server.assets import static_assets
+from project.server.export import EXPORT_FORMATS, iter_completions
+from project.server.models import Child, CompletedChore, WeekVersion, WeeklyTotals
+from project.server.cache import get_children, get_chores, page_cache
+from project.server.services import completion_history, decode_cursor, record_completion, week_start_for
 from project.server.user.forms import CompleteChoreForm
 
 main_blueprint = Blueprint("main", __name__)
@@ -19,13 +40,119 @@ def get_start_of_week():
     return start_of_week
 
 
-def get_child_weekly_total(child_id, start_of_week, end_of_week):
-    weekly_total = db.session.query(WeeklyTotals.total).filter(
-        WeeklyTotals.child_id == child_id,
+def get_week_versions(start_of_week):
+    """{week_start: (version, updated_at)} for every week the seven days from start_of_week fall in.
+
+    One primary key lookup; weeks never written are at version 0.
+    """
+    first = start_of_week.date()
+    weeks = sorted({week_start_for(first), week_start_for(first + timedelta(days=6))})
+    found = {week: (version, updated_at) for week, version, updated_at in db.session.query(
+        WeekVersion.week_start, WeekVersion.version, WeekVersion.updated_at
+    ).filter(WeekVersion.week_start.in_(weeks))}
+    return {week: found.get(week, (0, None)) for week in weeks}
+
+
+def week_token(versions):
+    """The week versions as a string, for stamping page cache entries."""
+    return ",".join(f"{week}={version}@{updated_at}" for week, (version, updated_at) in versions.items())
+
+
+def week_role():
+    return "admin" if current_user.admin else "user"
+
+
+def week_validators(start_of_week, versions, *extra):
+    """A weak ETag and Last-Modified for a page showing the seven days from start_of_week.
+
+    The ETag covers the week versions, the user, the current week, the
+    deployed templates and assets and any ``extra`` values, so it changes
+    whenever the page would.
+    """
+    parts = [request.endpoint, start_of_week.date(), current_user.id, get_start_of_week().date(),
+             current_app.config["BUILD_ID"], static_assets.version, *extra]
+    parts += [f"{week}={version}" for week, (version, _) in versions.items()]
+    etag = hashlib.sha1(":".join(map(str, parts)).encode()).hexdigest()[:20]
+    modified = [updated_at for _, updated_at in versions.values() if updated_at]
+    last_modified = max(modified).replace(tzinfo=timezone.utc, microsecond=0) if modified else None
+    return etag, last_modified
+
+
+def not_modified(etag, last_modified):
+    """A 304 response if the request's If-None-Match still matches etag, otherwise None.
+
+    If-Modified-Since alone is never enough: the week's date says nothing
+    about the user, role or current week the page was rendered for, which
+    the ETag covers. Pending flash messages always get a fresh page, they
+    would be lost otherwise.
+    """
+    if session.get("_flashes"):
+        return None
+    if not request.if_none_match or not request.if_none_match.contains_weak(etag):
+        return None
+    return with_validators(Response(status=304), etag, last_modified)
+
+
+def with_validators(response, etag, last_modified):
+    """Sets the ETag and Last-Modified, and has browsers revalidate on every use."""
+    response = make_response(response)
+    response.set_etag(etag, weak=True)
+    if last_modified:
+        response.last_modified = last_modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def parse_history_args(args):
+    """Reads the history filters and page cursor from the query string, aborting on bad input."""
+    try:
+        filters = dict(
+            child_id=args.get("child_id", type=int),
+            chore_id=args.get("chore_id", type=int),
+            start=datetime.strptime(args["start"], "%Y-%m-%d").date() if args.get("start") else None,
+            end=datetime.strptime(args["end"], "%Y-%m-%d").date() if args.get("end") else None,
+            after=args.get("after") or None,
+        )
+        if filters["after"]:
+            decode_cursor(filters["after"])
+    except ValueError:
+        abort(400)
+    limit = args.get("limit", current_app.config["HISTORY_PAGE_SIZE"], type=int)
+    filters["limit"] = min(max(limit, 1), current_app.config["HISTORY_MAX_PAGE_SIZE"])
+    return filters
+
+
+def week_completions_query(start_of_week, end_of_week):
+    """The week's completions, newest first, with child and chore loaded in the same query."""
+    return CompletedChore.query.options(
+        joinedload(CompletedChore.child),
+        joinedload(CompletedChore.chore),
+    ).filter(
+        # completed_on is a date, against a datetime SQLite would drop the first day
+        CompletedChore.completed_on >= start_of_week.date(),
+        CompletedChore.completed_on <= end_of_week.date(),
+    ).order_by(CompletedChore.completed_on.desc())
+
+
+def get_week_completions(start_of_week, end_of_week):
+    return week_completions_query(start_of_week, end_of_week).all()
+
+
+def weekly_totals_query(start_of_week, end_of_week):
+    """(child_id, name, total) rows summing each child's totals for the week."""
+    return db.session.query(Child.id, Child.name, func.sum(WeeklyTotals.total)).join(
+        WeeklyTotals, WeeklyTotals.child_id == Child.id
+    ).filter(
         WeeklyTotals.week_start >= start_of_week.date(),
         WeeklyTotals.week_start <= end_of_week.date()
-    ).scalar()
-    return weekly_total if weekly_total else 0
+    ).group_by(Child.id, Child.name).order_by(Child.name)
+
+
+def get_weekly_totals(start_of_week, end_of_week):
+    """Per-child totals for the week as {child_id: (name, total)}, in one query."""
+    rows = weekly_totals_query(start_of_week, end_of_week).all()
+    return {child_id: (name, total or 0) for child_id, name, total in rows}
 
 
 @main_blueprint.route("/", methods=["GET", "POST"])
@@ -35,36 +162,16 @@ def home():
         return redirect(url_for('user.login'))
 
     form = CompleteChoreForm(request.form)
-    start_of_week = get_start_of_week()
 
     if request.method == 'POST' and form.validate():
-        child_id = form.child.data
-        chore_id = form.chore.data
-        user_id = current_user.id  # Get the current user ID
-        new_chore = CompletedChore(chore_id=chore_id, child_id=child_id, user_id=user_id)
-
-        chore_value = db.session.query(Chore.value).filter(Chore.id == chore_id).scalar()
+        completion_id = record_completion(child_id=int(form.child.data),
+                                          chore_id=int(form.chore.data),
+                                          user_id=current_user.id)
 
-        if chore_value is None:
+        if completion_id is None:
             flash('Chore value not found.', 'danger')
             return redirect(url_for('main.home'))
 
-        weekly_total = db.session.query(WeeklyTotals).filter(
-            WeeklyTotals.child_id == child_id,
-            WeeklyTotals.week_start == start_of_week.date()
-            ).first()
-
-        if weekly_total is None:
-            # Create a new WeeklyTotals instance if it doesn't exist
-            weekly_total = WeeklyTotals(child_id=child_id, week_start=start_of_week.date(), total=chore_value)
-        else:
-            # Update the total value
-            weekly_total.total += chore_value
-
-        db.session.add(new_chore)
-        db.session.add(weekly_total)
-        db.session.commit()
-
         flash('Chore assigned.')
 
         return redirect(url_for('main.home'))
@@ -86,22 +193,63 @@ def summary():
         # Default to the current week's Monday if no input
         start_of_week = get_start_of_week()
 
-    end_of_week = start_of_week + timedelta(days=6, hours=23, minutes=59, seconds=59)
-
-    weekly_chores = CompletedChore.query.filter(
-        CompletedChore.completed_on >= start_of_week,
-        CompletedChore.completed_on <= end_of_week,
-        ).order_by(CompletedChore.completed_on.desc()).all()
-
-    running_total = {}
-    for chore in weekly_chores:
-        if chore.child_id not in running_total:
-            child = Child.query.get(chore.child_id)
-            running_total[chore.child_id] = child.name, get_child_weekly_total(chore.child_id,
-                                                                               start_of_week,
-                                                                               end_of_week)
-
-    return render_template("main/summary.html", weekly_chores=weekly_chores,
-                           start_of_week=start_of_week,
-                           running_total=running_total,
-                           this_week=this_week,)
+    versions = get_week_versions(start_of_week)
+    validators = week_validators(start_of_week, versions)
+    response = not_modified(*validators)
+    if response is not None:
+        return response
+
+    cache_key = ("main.summary", start_of_week.date().isoformat(), week_role())
+    token = week_token(versions)
+    week_html = page_cache.get(cache_key, token)
+    if week_html is None:
+        end_of_week = start_of_week + timedelta(days=6, hours=23, minutes=59, seconds=59)
+
+        weekly_chores = get_week_completions(start_of_week, end_of_week)
+        running_total = get_weekly_totals(start_of_week, end_of_week)
+
+        week_html = render_template("main/_summary_week.html", weekly_chores=weekly_chores,
+                                    running_total=running_total,)
+        page_cache.set(cache_key, token, week_html)
+
+    return with_validators(render_template("main/summary.html", week_html=Markup(week_html),
+                                           start_of_week=start_of_week,
+                                           this_week=this_week,), *validators)
+
+
+@main_blueprint.route("/export/completions")
+@login_required
+def export_completions():
+    export_format = request.args.get("format", "csv")
+    if export_format not in EXPORT_FORMATS:
+        abort(400)
+    try:
+        start, end = (datetime.strptime(request.args[arg], "%Y-%m-%d").date() if request.args.get(arg) else None
+                      for arg in ("start", "end"))
+    except ValueError:
+        abort(400)
+    child_id = request.args.get("child_id", type=int)
+
+    write, mimetype = EXPORT_FORMATS[export_format]
+    rows = iter_completions(start=start, end=end, child_id=child_id)
+    return Response(
+        stream_with_context(write(rows)),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename=completions.{export_format}"},
+    )
+
+
+@main_blueprint.route("/history/")
+@login_required
+def history():
+    filters = parse_history_args(request.args)
+    completions, next_cursor = completion_history(**filters)
+    query_args = {k: v for k, v in request.args.items() if k != "after" and v}
+
+    return render_template("main/history.html",
+                           completions=completions,
+                           next_cursor=next_cursor,
+                           filters=filters,
+                           query_args=query_args,
+                           children=get_children(),
+                           chores=get_chores(),)
@@ -0,0 +1,256 @@
+# project/server/metrics.py
+
+
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+
+from flask import Response, has_app_context, request
+
+from project.server import db
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (1, 2, 5, 10, 20, 50, 100)
+
+# name: (type, help, histogram buckets)
+METRICS = {
+    "chore_tracker_request_duration_seconds": (
+        "histogram", "Request latency by endpoint.", LATENCY_BUCKETS),
+    "chore_tracker_requests_total": (
+        "counter", "Requests by endpoint, method and status code.", None),
+    "chore_tracker_request_db_queries": (
+        "histogram", "SQL statements per request by endpoint.", QUERY_BUCKETS),
+    "chore_tracker_request_db_seconds": (
+        "histogram", "Time spent in SQL per request by endpoint.", LATENCY_BUCKETS),
+    "chore_tracker_db_pool_checked_out": (
+        "gauge", "Connections checked out of the pool, summed over live workers.", None),
+    "chore_tracker_completions_recorded_total": (
+        "counter", "Completed chores recorded.", None),
+}
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class Metrics(object):
+    """Prometheus style metrics shared by every gunicorn worker.
+
+    Each process keeps its own values and writes them to a file of its own
+    in METRICS_DIR, at most every METRICS_FLUSH_SECONDS and no later than
+    that after its last request. ``/metrics`` adds
+    up the files of all processes, keeping the counters of workers that
+    have exited but dropping their gauges. gunicorn's master folds an
+    exited worker's file into an archive with archive(), before a new
+    worker can reuse its pid. Without METRICS_DIR only this process is
+    reported.
+    """
+
+    def __init__(self):
+        self.directory = None
+        self.flush_seconds = 1.0
+        self._values = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flushed = 0.0
+        self._timer = None
+        os.register_at_fork(after_in_child=self._reset)
+
+    def init_app(self, app):
+        self.directory = app.config.get("METRICS_DIR")
+        self.flush_seconds = app.config.get("METRICS_FLUSH_SECONDS", self.flush_seconds)
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+        app.add_url_rule("/metrics", "metrics", self.metrics_view)
+
+        from project.server.timing import request_timing
+
+        request_timing.observe(self._observe_request)
+
+    def _reset(self):
+        self._values = {}
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._flushed = 0.0
+        self._timer = None
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        with self._lock:
+            self._values[(name, tuple(sorted(labels.items())))] = value
+
+    def observe(self, name, value, **labels):
+        buckets = METRICS[name][2]
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            # per bucket counts (the last one is +Inf), then sum and count
+            histogram = self._values.setdefault(key, [0] * (len(buckets) + 3))
+            histogram[next((i for i, bound in enumerate(buckets) if value <= bound), len(buckets))] += 1
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def _observe_request(self, response, timing):
+        endpoint = request.endpoint or "unmatched"
+        self.observe("chore_tracker_request_duration_seconds", timing["total"], endpoint=endpoint)
+        self.observe("chore_tracker_request_db_queries", timing["statements"], endpoint=endpoint)
+        self.observe("chore_tracker_request_db_seconds", timing["db"], endpoint=endpoint)
+        self.inc("chore_tracker_requests_total", endpoint=endpoint, method=request.method,
+                 status=str(response.status_code))
+        self.flush_soon()
+
+    def _sample_pool(self):
+        if not has_app_context():
+            return
+        checkedout = getattr(db.engine.pool, "checkedout", None)
+        if checkedout is not None:
+            self.set("chore_tracker_db_pool_checked_out", checkedout())
+
+    def _path(self, pid):
+        return os.path.join(self.directory, f"metrics_{pid}.json")
+
+    def flush_soon(self):
+        """Flushes now if the last flush is old enough, otherwise once it is."""
+        if not self.directory:
+            return
+        if time.monotonic() - self._flushed >= self.flush_seconds:
+            self.flush()
+            return
+        with self._lock:
+            if self._timer is None:
+                self._timer = threading.Timer(self.flush_seconds, self._timed_flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _timed_flush(self):
+        with self._lock:
+            self._timer = None
+        self.flush()
+
+    def flush(self):
+        """Writes this process's values to its file, atomically."""
+        if not self.directory:
+            return
+        # request threads and the timer share one temporary file
+        with self._flush_lock:
+            self._flushed = time.monotonic()
+            self._sample_pool()
+            with self._lock:
+                entries = [[name, dict(labels), value] for (name, labels), value in self._values.items()]
+            path = self._path(os.getpid())
+            with open(f"{path}.tmp", "w") as f:
+                json.dump(entries, f)
+            os.replace(f"{path}.tmp", path)
+
+    def archive(self, pid):
+        """Folds the counters of an exited process into the archive and removes its file.
+
+        Called from gunicorn's master only, once per exited worker, so
+        archives are never written concurrently.
+        """
+        if not self.directory:
+            return
+        path = self._path(pid)
+        entries = _read(path)
+        if entries is None:
+            return
+        totals = {}
+        _add_up(totals, _read(self._archive_path()) or [], alive=False)
+        _add_up(totals, entries, alive=False)
+        archive_path = self._archive_path()
+        with open(f"{archive_path}.tmp", "w") as f:
+            json.dump([[name, dict(labels), value] for (name, labels), value in totals.items()], f)
+        os.replace(f"{archive_path}.tmp", archive_path)
+        os.remove(path)
+
+    def _archive_path(self):
+        return os.path.join(self.directory, "archived.json")
+
+    def collect(self):
+        """{(name, labels): value} for every process."""
+        if not self.directory:
+            self._sample_pool()
+            with self._lock:
+                return {key: list(value) if isinstance(value, list) else value
+                        for key, value in self._values.items()}
+
+        self.flush()
+        totals = {}
+        _add_up(totals, _read(self._archive_path()) or [], alive=False)
+        for path in glob.glob(os.path.join(self.directory, "metrics_*.json")):
+            pid = int(os.path.basename(path)[len("metrics_"):-len(".json")])
+            _add_up(totals, _read(path) or [], alive=_pid_alive(pid))
+        return totals
+
+    def render(self):
+        """The collected metrics in the Prometheus text exposition format."""
+        collected = self.collect()
+        lines = []
+        for name, (kind, help_text, buckets) in METRICS.items():
+            series = sorted((labels, value) for (n, labels), value in collected.items() if n == name)
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in series:
+                if kind != "histogram":
+                    lines.append(f"{name}{_labels(labels)} {_number(value)}")
+                    continue
+                cumulative = 0
+                for bound, count in zip(list(buckets) + ["+Inf"], value):
+                    cumulative += count
+                    lines.append(f"{name}_bucket{_labels(labels + (('le', str(bound)),))} {cumulative}")
+                lines.append(f"{name}_sum{_labels(labels)} {_number(value[-2])}")
+                lines.append(f"{name}_count{_labels(labels)} {value[-1]}")
+        return "\n".join(lines) + "\n"
+
+    def metrics_view(self):
+        return Response(self.render(), mimetype="text/plain; version=0.0.4")
+
+
+def _read(path):
+    """The entries in a metrics file, or None if it is missing or half written."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _add_up(totals, entries, alive):
+    """Adds file entries into {(name, labels): value}, skipping the gauges of exited processes."""
+    for name, labels, value in entries:
+        if name not in METRICS or (METRICS[name][0] == "gauge" and not alive):
+            continue
+        key = (name, tuple(sorted(labels.items())))
+        if isinstance(value, list):
+            current = totals.setdefault(key, [0] * len(value))
+            totals[key] = [a + b for a, b in zip(current, value)]
+        else:
+            totals[key] = totals.get(key, 0) + value
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in labels)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+metrics = Metrics()
+# the last second of a worker's values would be lost otherwise
+atexit.register(metrics.flush)
@@ -3,10 +3,10 @@
 
 import datetime
 
-from flask import current_app
 from flask_login import UserMixin
 
-from project.server import bcrypt, db
+from project.server import db
+from project.server.passwords import password_hasher
 
 
 class User(db.Model, UserMixin):
@@ -18,19 +18,29 @@ class User(db.Model, UserMixin):
     password = db.Column(db.String(255), nullable=False)
     registered_on = db.Column(db.DateTime, nullable=False)
     admin = db.Column(db.Boolean, nullable=False, default=False)
+    session_version = db.Column(db.Integer, nullable=False, default=0, server_default="0")
 
     def __init__(self, user_name, password, admin=False):
         self.user_name = user_name
-        self.password = bcrypt.generate_password_hash(
-            password, current_app.config.get("BCRYPT_LOG_ROUNDS")
-        ).decode("utf-8")
+        self.password = password_hasher.hash(password)
         self.registered_on = datetime.datetime.now()
         self.admin = admin
+        self.session_version = 0
 
     def set_password(self, password):
-        self.password = bcrypt.generate_password_hash(
-            password, current_app.config.get("BCRYPT_LOG_ROUNDS")
-        ).decode("utf-8")
+        self.password = password_hasher.hash(password)
+        self.bump_session_version()
+
+    def rehash_password(self, password):
+        """Re-hashes the same password at the configured cost, keeping other sessions signed in."""
+        self.password = password_hasher.hash(password)
+
+    def bump_session_version(self):
+        """Marks cached copies of this user (and session stamps) as stale."""
+        self.session_version = (self.session_version or 0) + 1
+
+    def check_password(self, password):
+        return password_hasher.check(self.password, password)
 
     def __repr__(self):
         return "<User {0}>".format(self.user_name)
@@ -69,6 +79,13 @@ class Chore(db.Model):
 class CompletedChore(db.Model):
 
     __tablename__ = "completed_chores"
+    __table_args__ = (
+        db.Index("ix_completed_chores_completed_on_child_id", "completed_on", "child_id"),
+        db.Index("ix_completed_chores_child_id_completed_on", "child_id", "completed_on"),
+        # keyset order of the history pages, unfiltered and by chore
+        db.Index("ix_completed_chores_completed_on_id", "completed_on", "id"),
+        db.Index("ix_completed_chores_chore_id_completed_on_id", "chore_id", "completed_on", "id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     chore_id = db.Column(db.Integer, db.ForeignKey('chores.id'), nullable=False)
@@ -95,6 +112,10 @@ class CompletedChore(db.Model):
 class WeeklyTotals(db.Model):
 
     __tablename__ = "weekly_totals"
+    __table_args__ = (
+        db.Index("ux_weekly_totals_child_id_week_start", "child_id", "week_start", unique=True),
+        db.Index("ix_weekly_totals_week_start_child_id", "week_start", "child_id"),
+    )
 
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     child_id = db.Column(db.Integer, db.ForeignKey('children.id'), nullable=False)
@@ -115,3 +136,83 @@ class WeeklyTotals(db.Model):
 
     def __repr__(self):
         return "<WeeklyTotals {0}>".format(self.id)
+
+
+class MonthlyTotals(db.Model):
+
+    __tablename__ = "monthly_totals"
+    __table_args__ = (
+        db.Index("ux_monthly_totals_child_id_month_start", "child_id", "month_start", unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    child_id = db.Column(db.Integer, db.ForeignKey('children.id'), nullable=False)
+    month_start = db.Column(db.Date, nullable=False)
+    total = db.Column(db.Float, nullable=False)
+
+    child = db.relationship('Child', backref='monthly_totals')
+
+    def __init__(self, child_id, month_start, total=None):
+        self.child_id = child_id
+        self.month_start = month_start
+        self.total = total
+
+    def __repr__(self):
+        return "<MonthlyTotals {0}>".format(self.id)
+
+
+class YearlyTotals(db.Model):
+
+    __tablename__ = "yearly_totals"
+    __table_args__ = (
+        db.Index("ux_yearly_totals_child_id_year", "child_id", "year", unique=True),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    child_id = db.Column(db.Integer, db.ForeignKey('children.id'), nullable=False)
+    year = db.Column(db.Integer, nullable=False)
+    total = db.Column(db.Float, nullable=False)
+
+    child = db.relationship('Child', backref='yearly_totals')
+
+    def __init__(self, child_id, year, total=None):
+        self.child_id = child_id
+        self.year = year
+        self.total = total
+
+    def __repr__(self):
+        return "<YearlyTotals {0}>".format(self.id)
+
+
+class CacheVersion(db.Model):
+
+    __tablename__ = "cache_versions"
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+    def __init__(self, name, version=0):
+        self.name = name
+        self.version = version
+
+    def __repr__(self):
+        return "<CacheVersion {0}={1}>".format(self.name, self.version)
+
+
+class WeekVersion(db.Model):
+    """Bumped whenever a week's completions or totals change, see bump_week_versions()."""
+
+    __tablename__ = "week_versions"
+
+    week_start = db.Column(db.Date, primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+    # naive UTC, sent as Last-Modified
+    updated_at = db.Column(db.DateTime, nullable=False)
+
+    def __init__(self, week_start, version=0, updated_at=None):
+        self.week_start = week_start
+        self.version = version
+        self.updated_at = updated_at or datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+
+    def __repr__(self):
+        return "<WeekVersion {0}={1}>".format(self.week_start, self.version)
@@ -0,0 +1,59 @@
+# project/server/passwords.py
+
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from flask import current_app
+
+from project.server import bcrypt
+
+
+class PasswordHasher(object):
+    """Runs bcrypt on a small bounded thread pool.
+
+    The calling request thread still waits for the result, so this does not
+    make a login faster or free its thread. What keeps other requests served
+    meanwhile is gunicorn's threaded workers together with bcrypt releasing
+    the GIL. The pool only caps how many CPU-heavy hashes a worker runs at
+    once however many logins arrive together. It is created on first use,
+    after any fork.
+    """
+
+    def __init__(self, max_workers=2):
+        self.max_workers = max_workers
+        self._pool = None
+        self._lock = threading.Lock()
+        os.register_at_fork(after_in_child=self._reset)
+
+    def init_app(self, app):
+        self.max_workers = app.config.get("PASSWORD_HASH_WORKERS", self.max_workers)
+
+    def _reset(self):
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _submit(self, fn, *args):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="bcrypt")
+        return self._pool.submit(fn, *args).result()
+
+    def hash(self, password, rounds=None):
+        rounds = rounds or current_app.config.get("BCRYPT_LOG_ROUNDS")
+        return self._submit(bcrypt.generate_password_hash, password, rounds).decode("utf-8")
+
+    def check(self, pw_hash, password):
+        return self._submit(bcrypt.check_password_hash, pw_hash, password)
+
+    def needs_rehash(self, pw_hash):
+        """True if the hash was made with a lower cost than configured."""
+        try:
+            rounds = int(pw_hash.split("$")[2])
+        except (IndexError, ValueError):
+            return True
+        return rounds < current_app.config.get("BCRYPT_LOG_ROUNDS")
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,57 @@
+# project/server/profiling.py
+
+
+import json
+import os
+import subprocess
+import sys
+
+basedir = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+FIRST_REQUEST_SCRIPT = """
+import json, time
+started = time.perf_counter()
+from {module} import {attr}
+imported = time.perf_counter()
+app = {attr} if hasattr({attr}, "wsgi_app") else {attr}()
+created = time.perf_counter()
+status = app.test_client().get({path!r}).status_code
+served = time.perf_counter()
+print(json.dumps(dict(imported=imported - started, created=created - imported,
+                      first_request=served - created, total=served - started, status=status)))
+"""
+
+
+def run_python(args):
+    """Runs a fresh interpreter from the repo root, so nothing is already imported.
+
+    The flask cli marker is dropped so the child boots like a gunicorn worker.
+    """
+    env = {k: v for k, v in os.environ.items() if k != "FLASK_RUN_FROM_CLI"}
+    return subprocess.run(
+        [sys.executable] + args,
+        cwd=basedir,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def import_times(target="wsgi"):
+    """Parses ``python -X importtime`` output as [(module, self_us, cumulative_us)]."""
+    stderr = run_python(["-X", "importtime", "-c", f"import {target}"]).stderr
+    times = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, module = line[len("import time:"):].split("|")
+        times.append((module.strip(), int(self_us), int(cumulative_us)))
+    return times
+
+
+def time_to_first_request(target="wsgi:app", path="/login"):
+    """Seconds spent importing, building the app and serving its first request."""
+    module, _, attr = target.partition(":")
+    script = FIRST_REQUEST_SCRIPT.format(module=module, attr=attr or "app", path=path)
+    return json.loads(run_python(["-c", script]).stdout.strip().splitlines()[-1])
@@ -0,0 +1,117 @@
+# project/server/reconcile.py
+
+
+import math
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from sqlalchemy import create_engine, func, insert, select, update
+
+from project.server import db
+from project.server.models import CompletedChore, WeeklyTotals
+from project.server.services import ROLLUPS, bump_week_versions
+
+
+def daily_sums_query(start=None, end=None):
+    query = select(
+        CompletedChore.child_id, CompletedChore.completed_on, func.sum(CompletedChore.value)
+    ).group_by(CompletedChore.child_id, CompletedChore.completed_on)
+    if start:
+        query = query.where(CompletedChore.completed_on >= start)
+    if end:
+        query = query.where(CompletedChore.completed_on <= end)
+    return query
+
+
+def chunk_daily_sums(database_url, start, end):
+    """Runs in a pool worker with its own engine and read connection."""
+    engine = create_engine(database_url)
+    try:
+        with engine.connect() as connection:
+            return connection.execute(daily_sums_query(start, end)).all()
+    finally:
+        engine.dispose()
+
+
+def date_chunks(first, last, count):
+    """Splits [first, last] into at most count contiguous date ranges."""
+    days = (last - first).days + 1
+    size = max(1, math.ceil(days / count))
+    start = first
+    while start <= last:
+        end = min(start + timedelta(days=size - 1), last)
+        yield start, end
+        start = end + timedelta(days=1)
+
+
+def ledger_daily_sums(workers=4):
+    """Per-child, per-day sums of the whole ledger as [(child_id, day, total)].
+
+    The ledger's date range is split into one chunk per worker and each
+    chunk is aggregated by a separate process. In-memory SQLite databases
+    cannot be shared between processes and are aggregated in place.
+    """
+    url = db.engine.url
+    first, last = db.session.query(func.min(CompletedChore.completed_on), func.max(CompletedChore.completed_on)).one()
+    if first is None:
+        return []
+    in_memory = url.get_backend_name() == "sqlite" and url.database in (None, "", ":memory:")
+    if workers <= 1 or in_memory:
+        return db.session.execute(daily_sums_query()).all()
+
+    database_url = url.render_as_string(hide_password=False)
+    chunks = list(date_chunks(first, last, workers))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = pool.map(chunk_daily_sums, [database_url] * len(chunks), *zip(*chunks))
+        return [row for rows in results for row in rows]
+
+
+def expected_totals(daily_sums):
+    """Folds daily sums into {model: {(child_id, period): total}} for every rollup."""
+    expected = {}
+    for model, _, period_for in ROLLUPS:
+        totals = expected.setdefault(model, {})
+        for child_id, day, total in daily_sums:
+            key = (child_id, period_for(day))
+            totals[key] = totals.get(key, 0) + total
+    return expected
+
+
+def find_mismatches(expected):
+    """Compares stored rollups with the expected totals, one query per table.
+
+    Returns (model, child_id, period, row_id, stored, expected) tuples, with
+    row_id None where the rollup row is missing.
+    """
+    mismatches = []
+    for model, period_column, _ in ROLLUPS:
+        totals = dict(expected.get(model, {}))
+        stored = db.session.query(model.id, model.child_id, getattr(model, period_column), model.total)
+        for row_id, child_id, period, total in stored:
+            want = totals.pop((child_id, period), 0)
+            if not math.isclose(total, want, abs_tol=1e-6):
+                mismatches.append((model, child_id, period, row_id, total, want))
+        for (child_id, period), want in totals.items():
+            mismatches.append((model, child_id, period, None, None, want))
+    return mismatches
+
+
+def format_mismatch(mismatch):
+    model, child_id, period, row_id, stored, want = mismatch
+    stored = "missing" if row_id is None else stored
+    return f"{model.__tablename__} child_id={child_id} period={period}: {stored} -> {want}"
+
+
+def apply_corrections(mismatches):
+    """Writes the expected totals back with one bulk UPDATE and INSERT per table."""
+    for model, period_column, _ in ROLLUPS:
+        updates = [dict(id=row_id, total=want)
+                   for m, _, _, row_id, _, want in mismatches if m is model and row_id is not None]
+        inserts = [{"child_id": child_id, period_column: period, "total": want}
+                   for m, child_id, period, row_id, _, want in mismatches if m is model and row_id is None]
+        if updates:
+            db.session.execute(update(model), updates)
+        if inserts:
+            db.session.execute(insert(model), inserts)
+    bump_week_versions(period for m, _, period, _, _, _ in mismatches if m is WeeklyTotals)
+    db.session.commit()
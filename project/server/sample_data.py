@@ -0,0 +1,152 @@
+# project/server/sample_data.py
+
+
+import random
+from datetime import date, datetime, timedelta
+from itertools import count, islice
+
+from sqlalchemy import Date, cast, func, insert, select, text, update
+
+from project.server import db
+from project.server.cache import reference_cache
+from project.server.models import Child, Chore, CompletedChore, User, WeeklyTotals
+from project.server.passwords import password_hasher
+from project.server.services import ROLLUPS, bump_week_versions, upsert_totals, week_start_for
+
+# rows per rollup upsert, keeps the bound parameters under SQLite's limit
+UPSERT_BATCH = 5000
+
+
+def zipf_weights(count, skew):
+    """Weights for ranks 1..count falling off as 1 / rank ** skew, mean 1."""
+    weights = [1 / rank ** skew for rank in range(1, count + 1)]
+    scale = count / sum(weights)
+    return [w * scale for w in weights]
+
+
+def generate_completions(rng, child_ids, chore_ids, chore_values, user_ids, start, end, per_day, skew):
+    """Yields completion rows day by day, oldest first.
+
+    Busy children and popular chores follow a zipf curve, weekends are
+    half again as busy and most entries come from the first few users.
+    """
+    child_rates = [per_day * w for w in zipf_weights(len(child_ids), skew)]
+    chore_pairs = list(zip(chore_ids, chore_values))
+    chore_cum = list(_cumulative(zipf_weights(len(chore_ids), skew)))
+    user_cum = list(_cumulative(zipf_weights(len(user_ids), skew)))
+
+    day = start
+    while day <= end:
+        weekend = 1.5 if day.weekday() >= 5 else 1.0
+        for child_id, rate in zip(child_ids, child_rates):
+            rate *= weekend
+            count = int(rate) + (rng.random() < rate % 1)
+            if not count:
+                continue
+            chores = rng.choices(chore_pairs, cum_weights=chore_cum, k=count)
+            users = rng.choices(user_ids, cum_weights=user_cum, k=count)
+            for (chore_id, value), user_id in zip(chores, users):
+                yield {
+                    "chore_id": chore_id,
+                    "child_id": child_id,
+                    "user_id": user_id,
+                    "completed_on": day,
+                    "value": value,
+                }
+        day += timedelta(days=1)
+
+
+def _cumulative(weights):
+    total = 0
+    for weight in weights:
+        total += weight
+        yield total
+
+
+def free_user_names(number):
+    """The first ``number`` of user0000, user0001... that are not taken yet."""
+    taken = set(db.session.scalars(select(User.user_name).where(User.user_name.like("user%"))))
+    return list(islice((name for name in (f"user{i:04d}" for i in count()) if name not in taken), number))
+
+
+def week_end(week_start):
+    """SQL for the last day of the week starting on the week_start column."""
+    if db.engine.dialect.name == "postgresql":
+        return cast(week_start + text("interval '6 days'"), Date)
+    return func.date(week_start, "+6 days")
+
+
+def upsert_rollups(deltas):
+    """Writes {model: {(child_id, period): total}} with batched upserts."""
+    for model, period_column, _ in ROLLUPS:
+        items = iter(deltas[model].items())
+        for batch in iter(lambda: dict(islice(items, UPSERT_BATCH)), {}):
+            upsert_totals(model, period_column, batch)
+
+
+def generate_data(children=10, chores=20, users=5, years=3, per_day=3.0, skew=1.0,
+                  seed=0, end=None, batch_size=50000, progress=None):
+    """Loads a synthetic household into the database.
+
+    Children, chores and users are inserted first, then ``years`` of
+    completions ending at ``end`` go in with executemany inserts, committed
+    every ``batch_size`` rows together with the matching weekly, monthly and
+    yearly totals. Weeks before the current one are marked approved. The
+    same seed and end date always produce the same data. The database may
+    already hold data: new rows are added next to it, and users get the
+    first free ``userNNNN`` names. Returns the number of completions
+    inserted.
+    """
+    rng = random.Random(seed)
+    end = end or date.today()
+    start = end - timedelta(days=365 * years - 1)
+
+    # one bcrypt hash shared by every generated user, password "password"
+    pw_hash = password_hasher.hash("password")
+    registered_on = datetime.combine(start, datetime.min.time())
+    user_ids = db.session.scalars(insert(User).returning(User.id, sort_by_parameter_order=True), [
+        {"user_name": name, "password": pw_hash, "admin": i == 0,
+         "registered_on": registered_on, "session_version": 0}
+        for i, name in enumerate(free_user_names(users))
+    ]).all()
+    child_ids = db.session.scalars(insert(Child).returning(Child.id, sort_by_parameter_order=True), [
+        {"name": f"Child {i}"} for i in range(children)
+    ]).all()
+    chore_rows = [{"chore": f"Chore {i}", "value": rng.choice((0.25, 0.5, 1.0, 1.5, 2.0, 5.0))}
+                  for i in range(chores)]
+    chore_ids = db.session.scalars(
+        insert(Chore).returning(Chore.id, sort_by_parameter_order=True), chore_rows).all()
+    reference_cache.invalidate("children", "chores", "users")
+    db.session.commit()
+
+    rows = generate_completions(
+        rng, child_ids, chore_ids, [c["value"] for c in chore_rows], user_ids, start, end, per_day, skew)
+    table = CompletedChore.__table__
+    inserted = 0
+    for batch in iter(lambda: list(islice(rows, batch_size)), []):
+        db.session.execute(table.insert(), batch)
+        deltas = {}
+        for model, _, period_for in ROLLUPS:
+            totals = deltas[model] = {}
+            for row in batch:
+                key = (row["child_id"], period_for(row["completed_on"]))
+                totals[key] = totals.get(key, 0) + row["value"]
+        upsert_rollups(deltas)
+        db.session.commit()
+        inserted += len(batch)
+        if progress:
+            progress(inserted)
+
+    # closed weeks are approved on their last day
+    db.session.execute(
+        update(WeeklyTotals).where(
+            WeeklyTotals.week_start >= week_start_for(start),
+            WeeklyTotals.week_start < min(week_start_for(date.today()), end + timedelta(days=1)),
+            WeeklyTotals.child_id.in_(child_ids),
+            WeeklyTotals.approved_by.is_(None),
+        ).values(approved_by=user_ids[0], approved_on=week_end(WeeklyTotals.week_start))
+    )
+    bump_week_versions(week_start_for(start) + timedelta(days=7 * i)
+                       for i in range((week_start_for(end) - week_start_for(start)).days // 7 + 1))
+    db.session.commit()
+    return inserted
@@ -0,0 +1,215 @@
+# project/server/services.py
+
+
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import and_, delete, literal, or_, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import joinedload
+
+from project.server import db
+from project.server.metrics import metrics
+from project.server.models import Chore, CompletedChore, MonthlyTotals, WeekVersion, WeeklyTotals, YearlyTotals
+
+
+def week_start_for(day):
+    return day - timedelta(days=day.weekday())
+
+
+def month_start_for(day):
+    return day.replace(day=1)
+
+
+def year_for(day):
+    return day.year
+
+
+# rollup model, its period column and how a completion date maps onto it
+ROLLUPS = (
+    (WeeklyTotals, "week_start", week_start_for),
+    (MonthlyTotals, "month_start", month_start_for),
+    (YearlyTotals, "year", year_for),
+)
+
+
+def dialect_insert(table):
+    """An INSERT supporting ON CONFLICT for the bound database."""
+    if db.engine.dialect.name == "postgresql":
+        return postgresql.insert(table)
+    return sqlite.insert(table)
+
+
+def upsert_totals(model, period_column, deltas):
+    """Adds each {(child_id, period): delta} to the model's totals in one statement."""
+    if not deltas:
+        return
+    table = model.__table__
+    stmt = dialect_insert(table).values([
+        {"child_id": child_id, period_column: period, "total": delta}
+        for (child_id, period), delta in sorted(deltas.items())
+    ])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.child_id, table.c[period_column]],
+        set_={"total": table.c.total + stmt.excluded.total},
+    )
+    db.session.execute(stmt)
+
+
+def bump_week_versions(weeks):
+    """Bumps the data version of each week, in the caller's transaction.
+
+    Pages showing a week are validated against its version, so every write
+    to a week's completions or totals must come through here.
+    """
+    weeks = sorted(set(weeks))
+    if not weeks:
+        return
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    table = WeekVersion.__table__
+    stmt = dialect_insert(table).values([{"week_start": week, "version": 1, "updated_at": now} for week in weeks])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[table.c.week_start],
+        set_={"version": table.c.version + 1, "updated_at": stmt.excluded.updated_at},
+    )
+    db.session.execute(stmt)
+
+
+def adjust_totals(changes):
+    """Folds (child_id, completed_on, delta) changes into every rollup table.
+
+    Runs one upsert per rollup table however many changes there are, in the
+    caller's transaction, and bumps the version of every week touched.
+    """
+    changes = list(changes)
+    for model, period_column, period_for in ROLLUPS:
+        deltas = {}
+        for child_id, completed_on, delta in changes:
+            key = (child_id, period_for(completed_on))
+            deltas[key] = deltas.get(key, 0) + delta
+        upsert_totals(model, period_column, deltas)
+    bump_week_versions(week_start_for(completed_on) for _, completed_on, _ in changes)
+
+
+def record_completion(child_id, chore_id, user_id, completed_on=None, commit=True):
+    """Records a completed chore and adds its value to the weekly, monthly and yearly totals.
+
+    The chore's value is snapshotted from ``chores`` inside the INSERT and the
+    totals are bumped with upserts, so concurrent submissions from
+    several workers cannot lose an update. Returns the new completion id, or
+    None if the chore does not exist.
+    """
+    table = CompletedChore.__table__
+    completed_on = completed_on or date.today()
+    insert_completion = dialect_insert(table).from_select(
+        ["chore_id", "child_id", "user_id", "completed_on", "value"],
+        select(
+            literal(chore_id, table.c.chore_id.type),
+            literal(child_id, table.c.child_id.type),
+            literal(user_id, table.c.user_id.type),
+            literal(completed_on, table.c.completed_on.type),
+            Chore.value,
+        ).where(Chore.id == chore_id),
+    ).returning(table.c.id, table.c.value)
+
+    inserted = db.session.execute(insert_completion).first()
+    if inserted is None:
+        return None
+
+    adjust_totals([(child_id, completed_on, inserted.value)])
+    if commit:
+        db.session.commit()
+    metrics.inc("chore_tracker_completions_recorded_total")
+    return inserted.id
+
+
+def record_completions(entries, user_id, commit=True):
+    """Bulk version of record_completion() for already validated entries.
+
+    Each entry is a dict with child_id, chore_id, completed_on and value.
+    All rows go in with one bulk INSERT and each rollup table gets a single
+    upsert with one row per (child, period), all in one transaction. Returns
+    the number of completions recorded.
+    """
+    if not entries:
+        return 0
+    rows = [dict(entry, user_id=user_id) for entry in entries]
+    db.session.execute(CompletedChore.__table__.insert(), rows)
+
+    adjust_totals((entry["child_id"], entry["completed_on"], entry["value"]) for entry in entries)
+
+    if commit:
+        db.session.commit()
+    metrics.inc("chore_tracker_completions_recorded_total", len(rows))
+    return len(rows)
+
+
+def delete_completion(completion_id, commit=True):
+    """Deletes a completion and takes its recorded value back off every rollup.
+
+    Returns the deleted row's (child_id, completed_on, value), or None if
+    there was no such completion.
+    """
+    table = CompletedChore.__table__
+    deleted = db.session.execute(
+        delete(table).where(table.c.id == completion_id).returning(
+            table.c.child_id, table.c.completed_on, table.c.value
+        )
+    ).first()
+    if deleted is None:
+        return None
+
+    adjust_totals([(deleted.child_id, deleted.completed_on, -deleted.value)])
+    if commit:
+        db.session.commit()
+    return deleted
+
+
+def encode_cursor(completion):
+    return f"{completion.completed_on.isoformat()}_{completion.id}"
+
+
+def decode_cursor(cursor):
+    """Parses a history cursor, raising ValueError if it is malformed."""
+    day, _, completion_id = cursor.partition("_")
+    return date.fromisoformat(day), int(completion_id)
+
+
+def completion_history_query(child_id=None, chore_id=None, start=None, end=None, after=None):
+    """Completions after the cursor, newest first, with names eager loaded.
+
+    ``after`` is the cursor of the last row of the previous page. Rows are
+    found with an index range on (completed_on, id) rather than OFFSET, so a
+    deep page costs the same as the first one.
+    """
+    query = CompletedChore.query.options(
+        joinedload(CompletedChore.child),
+        joinedload(CompletedChore.chore),
+        joinedload(CompletedChore.user),
+    )
+    if child_id:
+        query = query.filter(CompletedChore.child_id == child_id)
+    if chore_id:
+        query = query.filter(CompletedChore.chore_id == chore_id)
+    if start:
+        query = query.filter(CompletedChore.completed_on >= start)
+    if end:
+        query = query.filter(CompletedChore.completed_on <= end)
+    if after:
+        after_day, after_id = decode_cursor(after)
+        query = query.filter(
+            CompletedChore.completed_on <= after_day,
+            or_(CompletedChore.completed_on < after_day,
+                and_(CompletedChore.completed_on == after_day, CompletedChore.id < after_id)),
+        )
+    return query.order_by(CompletedChore.completed_on.desc(), CompletedChore.id.desc())
+
+
+def completion_history(limit=50, **filters):
+    """One page of completion history as (completions, next_cursor).
+
+    next_cursor is None on the last page.
+    """
+    completions = completion_history_query(**filters).limit(limit + 1).all()
+
+    next_cursor = encode_cursor(completions[limit - 1]) if len(completions) > limit else None
+    return completions[:limit], next_cursor
@@ -0,0 +1,123 @@
+# project/server/timing.py
+
+
+import json
+import logging
+import time
+
+from flask import (
+    before_render_template,
+    current_app,
+    g,
+    has_app_context,
+    has_request_context,
+    request,
+    template_rendered,
+)
+from flask.logging import default_handler, has_level_handler
+from sqlalchemy import event
+
+from project.server import db
+
+logger = logging.getLogger(__name__)
+
+
+def configure_logger(app):
+    """Logs request lines at INFO with REQUEST_LOG on, and slow queries at WARNING either way.
+
+    Records go to flask's stderr handler unless a handler is already set up
+    above this logger, by gunicorn or logging config for instance.
+    """
+    logger.setLevel(logging.INFO if app.config.get("REQUEST_LOG") else logging.WARNING)
+    if default_handler in logger.handlers or not has_level_handler(logger):
+        logger.addHandler(default_handler)
+        # app.logger may add the same handler above this logger later
+        logger.propagate = False
+
+
+class RequestTiming(object):
+    """Per-request SQL and template timings.
+
+    Cursor events on the engine count statements and add up their time,
+    template signals time rendering. After each request the totals go out
+    as a ``Server-Timing`` header and one JSON log line, and any statement
+    slower than SLOW_QUERY_MS is logged with the endpoint that ran it.
+    """
+
+    def __init__(self):
+        self._observers = []
+
+    def init_app(self, app):
+        with app.app_context():
+            event.listen(db.engine, "before_cursor_execute", self._before_cursor_execute)
+            event.listen(db.engine, "after_cursor_execute", self._after_cursor_execute)
+        before_render_template.connect(self._before_render, app)
+        template_rendered.connect(self._after_render, app)
+        app.before_request(self._start)
+        app.after_request(self._finish)
+        configure_logger(app)
+
+    def observe(self, fn):
+        """Calls fn(response, timing) after every timed request.
+
+        timing holds statements plus db, render and total seconds.
+        """
+        if fn not in self._observers:
+            self._observers.append(fn)
+
+    def _start(self):
+        g._timing = dict(started=time.perf_counter(), statements=0, db=0.0, render=0.0)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("_query_started", []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["_query_started"].pop()
+        endpoint = None
+        if has_request_context():
+            endpoint = request.endpoint
+            timing = g.get("_timing")
+            if timing is not None:
+                timing["statements"] += 1
+                timing["db"] += elapsed
+        threshold = current_app.config.get("SLOW_QUERY_MS") if has_app_context() else None
+        if threshold is not None and elapsed * 1000 >= threshold:
+            logger.warning("slow query %.1fms endpoint=%s: %s", elapsed * 1000, endpoint, statement)
+
+    def _before_render(self, sender, template, context, **extra):
+        if "_timing" in g:
+            g._timing["render_started"] = time.perf_counter()
+
+    def _after_render(self, sender, template, context, **extra):
+        timing = g.get("_timing")
+        if timing is not None and "render_started" in timing:
+            timing["render"] += time.perf_counter() - timing.pop("render_started")
+
+    def _finish(self, response):
+        timing = g.pop("_timing", None)
+        if timing is None:
+            return response
+        total = timing["total"] = time.perf_counter() - timing["started"]
+        for observer in self._observers:
+            observer(response, timing)
+        if current_app.config.get("SERVER_TIMING"):
+            response.headers["Server-Timing"] = ", ".join([
+                f'db;dur={timing["db"] * 1000:.1f};desc="{timing["statements"]} queries"',
+                f'render;dur={timing["render"] * 1000:.1f}',
+                f'total;dur={total * 1000:.1f}',
+            ])
+        if current_app.config.get("REQUEST_LOG"):
+            logger.info(json.dumps(dict(
+                method=request.method,
+                path=request.path,
+                endpoint=request.endpoint,
+                status=response.status_code,
+                statements=timing["statements"],
+                db_ms=round(timing["db"] * 1000, 2),
+                render_ms=round(timing["render"] * 1000, 2),
+                total_ms=round(total * 1000, 2),
+            )))
+        return response
+
+
+request_timing = RequestTiming()
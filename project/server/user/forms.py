@@ -5,7 +5,9 @@ from flask_wtf import FlaskForm
 from wtforms import PasswordField, SelectField, StringField
 from wtforms.validators import DataRequired, EqualTo, Length
 
-from project.server.models import Child, Chore, CompletedChore, User, WeeklyTotals
+from project.server import db
+from project.server.cache import get_children, get_chores, get_users
+from project.server.models import CompletedChore
 
 
 class LoginForm(FlaskForm):
@@ -47,8 +49,8 @@ class CompleteChoreForm(FlaskForm):
 
     def __init__(self, *args, **kwargs):
         super(CompleteChoreForm, self).__init__(*args, **kwargs)
-        self.child.choices = [(c.id, c.name) for c in Child.query.all()]
-        self.chore.choices = [(c.id, c.chore) for c in Chore.query.all()]
+        self.child.choices = [(c.id, c.name) for c in get_children()]
+        self.chore.choices = [(c.id, c.chore) for c in get_chores()]
 
 
 class DeleteChoreForm(FlaskForm):
@@ -56,8 +58,14 @@ class DeleteChoreForm(FlaskForm):
 
     def __init__(self, *args, **kwargs):
         super(DeleteChoreForm, self).__init__(*args, **kwargs)
-        self.chore_id.choices = [(c.id, f"{c.child.name} - {c.chore.chore} - {c.completed_on}")
-                                 for c in CompletedChore.query.order_by(CompletedChore.id.desc()).limit(10)]
+        # the latest completions change too often to cache, their names come from the cached lists
+        children = {c.id: c.name for c in get_children()}
+        chores = {c.id: c.chore for c in get_chores()}
+        latest = db.session.query(
+            CompletedChore.id, CompletedChore.child_id, CompletedChore.chore_id, CompletedChore.completed_on
+        ).order_by(CompletedChore.id.desc()).limit(10)
+        self.chore_id.choices = [(id, f"{children.get(child_id)} - {chores.get(chore_id)} - {completed_on}")
+                                 for id, child_id, chore_id, completed_on in latest]
 
 
 class AddAdminForm(FlaskForm):
@@ -65,15 +73,15 @@ class AddAdminForm(FlaskForm):
 
     def __init__(self, *args, **kwargs):
         super(AddAdminForm, self).__init__(*args, **kwargs)
-        self.user_name.choices = [(u.user_name) for u in User.query.all()]
+        self.user_name.choices = [(u.user_name) for u in get_users()]
 
 
 class ApprovePaymentForm(FlaskForm):
     child = SelectField("Child")
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, weekly_totals=(), **kwargs):
         super(ApprovePaymentForm, self).__init__(*args, **kwargs)
-        self.child.choices = [(c.id, f"{c.child.name}") for c in WeeklyTotals.query.all()]
+        self.child.choices = [(row.child_id, row.child_name) for row in weekly_totals]
 
 
 class ResetPasswordForm(FlaskForm):
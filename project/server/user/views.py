@@ -1,14 +1,29 @@
 # project/server/user/views.py
 
-from datetime import datetime, timedelta
+import time
+from datetime import datetime
 from functools import wraps
 
-from flask import Blueprint, flash, redirect, render_template, request, url_for
+from flask import Blueprint, current_app, flash, redirect, render_template, request, session, url_for
 from flask_login import current_user, login_required, login_user, logout_user
-
-from project.server import bcrypt, db
-from project.server.main.views import get_child_weekly_total, get_start_of_week
-from project.server.models import Child, Chore, CompletedChore, User, WeeklyTotals
+from flask_wtf.csrf import generate_csrf
+from markupsafe import Markup
+from sqlalchemy.orm import aliased
+
+from project.server import db
+from project.server.cache import get_children, get_chores, page_cache, reference_cache, user_cache
+from project.server.main.views import (
+    get_start_of_week,
+    get_week_versions,
+    not_modified,
+    week_role,
+    week_token,
+    week_validators,
+    with_validators,
+)
+from project.server.passwords import password_hasher
+from project.server.services import bump_week_versions, delete_completion
+from project.server.models import Child, Chore, User, WeeklyTotals
 from project.server.user.forms import (
     AddAdminForm,
     AddChildForm,
@@ -39,6 +54,7 @@ def register():
     if form.validate_on_submit():
         user = User(user_name=form.user_name.data, password=form.password.data)
         db.session.add(user)
+        reference_cache.invalidate("users")
         db.session.commit()
 
         login_user(user)
@@ -54,10 +70,12 @@ def login():
     form = LoginForm(request.form)
     if form.validate_on_submit():
         user = User.query.filter_by(user_name=form.user_name.data).first()
-        if user and bcrypt.check_password_hash(
-            user.password, request.form["password"]
-        ):
+        if user and user.check_password(request.form["password"]):
+            if password_hasher.needs_rehash(user.password):
+                user.rehash_password(request.form["password"])
+                db.session.commit()
             login_user(user)
+            user_cache.remember(user)
             flash("You are logged in. Welcome!", "success")
             return redirect(url_for("main.home"))
         else:
@@ -82,17 +100,19 @@ def setup():
     if request.method == 'POST' and form_child.validate_on_submit():
         child = Child(name=form_child.name.data)
         db.session.add(child)
+        reference_cache.invalidate("children")
         db.session.commit()
         flash(f"Child {child.name} added.")
         return redirect(url_for("user.setup"))
 
-    children = Child.query.all()
-    chores = Chore.query.all()
+    children = get_children()
+    chores = get_chores()
 
     form_chore = AddChoreForm(request.form)
     if request.method == 'POST' and form_chore.validate_on_submit():
         chores = Chore(chore=form_chore.chore.data, value=form_chore.value.data)
         db.session.add(chores)
+        reference_cache.invalidate("chores")
         db.session.commit()
         flash(f"Chore {chores.chore} added.")
         return redirect(url_for("user.setup"))
@@ -100,25 +120,9 @@ def setup():
     form_delete = DeleteChoreForm(request.form)
     last_10_chores = Chore.query.order_by(Chore.id.desc()).limit(10)
     if request.method == 'POST' and form_delete.validate_on_submit():
-        chore_id = form_delete.chore_id.data
-        chore_to_delete = CompletedChore.query.get(chore_id)
-        if chore_to_delete:
-            chore_value = db.session.query(Chore.value).filter(Chore.id == chore_to_delete.chore_id).scalar()
-
-            weekly_total = db.session.query(WeeklyTotals).filter(
-                WeeklyTotals.child_id == chore_to_delete.child_id,
-                WeeklyTotals.week_start == chore_to_delete.completed_on - timedelta(
-                    days=chore_to_delete.completed_on.weekday()
-                    )
-            ).first()
-
-            if weekly_total and chore_value:
-                # Subtract the chore value from the weekly total
-                weekly_total.total -= chore_value
-                db.session.commit()
-
-        db.session.delete(chore_to_delete)
-        db.session.commit()
+        if delete_completion(int(form_delete.chore_id.data)) is None:
+            flash("Chore not found.", "danger")
+            return redirect(url_for("user.setup"))
         flash("Chore deleted.")
         return redirect(url_for("user.setup"))
 
@@ -127,7 +131,10 @@ def setup():
         user = User.query.filter_by(user_name=form_admin.user_name.data).first()
         if user:
             user.admin = True
+            user.bump_session_version()
+            reference_cache.invalidate("users")
             db.session.commit()
+            user_cache.invalidate(user.id)
             flash(f"{user.user_name} is now an admin.")
         else:
             flash(f"User {form_admin.user_name.data} not found.", "danger")
@@ -144,6 +151,42 @@ def setup():
                            )
 
 
+def week_approvals_query(start_of_week):
+    """The week's totals with child and approver names, in one joined query."""
+    approver = aliased(User)
+    return db.session.query(
+        WeeklyTotals.id,
+        WeeklyTotals.child_id,
+        Child.name.label("child_name"),
+        WeeklyTotals.total,
+        approver.user_name.label("approver_name"),
+        WeeklyTotals.approved_on,
+    ).join(
+        Child, Child.id == WeeklyTotals.child_id
+    ).outerjoin(
+        approver, approver.id == WeeklyTotals.approved_by
+    ).filter(
+        WeeklyTotals.week_start == start_of_week.date()
+    ).order_by(Child.name)
+
+
+def get_week_approvals(start_of_week):
+    return week_approvals_query(start_of_week).all()
+
+
+def csrf_validators():
+    """ETag parts that keep a revalidated form page's CSRF token usable.
+
+    They change with the session's token and halfway through the token's
+    time limit, so a page is never revalidated with an expired token.
+    """
+    if not current_app.config.get("WTF_CSRF_ENABLED", True):
+        return ()
+    generate_csrf()
+    limit = current_app.config.get("WTF_CSRF_TIME_LIMIT", 3600)
+    return session.get("csrf_token"), int(time.time() // (limit / 2)) if limit else 0
+
+
 @user_blueprint.route("/approval/", methods=["GET", "POST"])
 @login_required
 @admin_required
@@ -158,55 +201,64 @@ def approval():
         # Default to the current week's Monday if no input
         start_of_week = get_start_of_week()
 
-    end_of_week = start_of_week + timedelta(days=6, hours=23, minutes=59, seconds=59)
-
-    weekly_totals = db.session.query(WeeklyTotals).all()
-
-    running_total = {}
-    for child in weekly_totals:
-        if child.child_id not in running_total:
-            kid = Child.query.get(child.child_id)
-            running_total[child.child_id] = (kid.name, get_child_weekly_total(
-                child.child_id,
-                start_of_week,
-                end_of_week,
-                ))
-
-    approved = db.session.query(WeeklyTotals).filter_by(week_start=start_of_week.date()).all()
-    approved_this_week = {}
-    for child in approved:
-        if child.child_id not in approved:
-            kid = Child.query.get(child.child_id)
-            approved_by_user = User.query.get(child.approved_by)
-            child = WeeklyTotals.query.get(child.id)
-            approved_this_week[child.child_id] = (kid.name,
-                                                  approved_by_user.user_name if approved_by_user else "Not Approved",
-                                                  f"on {child.approved_on}" if child.approved_on else "",)
-
-    form = ApprovePaymentForm(request.form)
+    cached = None
+    if request.method == "GET":
+        versions = get_week_versions(start_of_week)
+        validators = week_validators(start_of_week, versions, *csrf_validators())
+        response = not_modified(*validators)
+        if response is not None:
+            return response
+        cache_key = ("user.approval", start_of_week.date().isoformat(), week_role())
+        token = week_token(versions)
+        cached = page_cache.get(cache_key, token)
+
+    if cached is None:
+        week_rows = get_week_approvals(start_of_week)
+
+        running_total = {}
+        approved_this_week = {}
+        for row in week_rows:
+            running_total[row.child_id] = (row.child_name, row.total)
+            approved_this_week[row.child_id] = (row.child_name,
+                                                row.approver_name if row.approver_name else "Not Approved",
+                                                f"on {row.approved_on}" if row.approved_on else "",)
+
+        week_html = render_template("main/_approval_week.html",
+                                    running_total=running_total,
+                                    approved_this_week=approved_this_week,
+                                    )
+        form = ApprovePaymentForm(request.form, weekly_totals=week_rows)
+        if request.method == "GET":
+            page_cache.set(cache_key, token, dict(html=week_html, choices=form.child.choices))
+    else:
+        week_html = cached["html"]
+        form = ApprovePaymentForm(request.form)
+        form.child.choices = [tuple(choice) for choice in cached["choices"]]
+
     if request.method == 'POST' and form.validate_on_submit():
-        child_name = form.child.data
-        child = Child.query.filter_by(id=child_name).first()
-        if child:
-            weekly_total = WeeklyTotals.query.filter_by(child_id=child.id, week_start=start_of_week.date()).first()
-            if weekly_total:
-                weekly_total.approved_by = current_user.id
-                weekly_total.approved_on = datetime.now()
-                db.session.commit()
-                flash(f"{child.name}'s allowance has been approved by {current_user.user_name}.")
-            else:
-                flash(f"No weekly total found for {child.name}.", "danger")
+        child_id = form.child.data
+        row = next((r for r in week_rows if str(r.child_id) == child_id), None)
+        if row:
+            db.session.query(WeeklyTotals).filter(WeeklyTotals.id == row.id).update(
+                {"approved_by": current_user.id, "approved_on": datetime.now().date()},
+                synchronize_session=False,
+            )
+            bump_week_versions([start_of_week.date()])
+            db.session.commit()
+            flash(f"{row.child_name}'s allowance has been approved by {current_user.user_name}.")
         else:
-            flash(f"User {child_name} not found.", "danger")
+            flash(f"No weekly total found for child {child_id}.", "danger")
         return redirect(url_for("user.approval"))
 
-    return render_template("main/approval.html",
-                           running_total=running_total,
+    page = render_template("main/approval.html",
+                           week_html=Markup(week_html),
                            start_of_week=start_of_week,
                            this_week=this_week,
                            form=form,
-                           approved_this_week=approved_this_week,
                            )
+    if request.method == "GET":
+        return with_validators(page, *validators)
+    return page
 
 
 @user_blueprint.route("/change_password/", methods=["GET", "POST"])
@@ -219,6 +271,7 @@ def change_password():
         if request.method == 'POST' and form.validate_on_submit():
             user.set_password(form.password.data)
             db.session.commit()
+            user_cache.invalidate(user.id)
             logout_user()
             flash('Your password has been changed.', 'success')
             return redirect(url_for('user.login'))
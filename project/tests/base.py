@@ -1,10 +1,15 @@
 # project/server/tests/base.py
 
 
+import os
+
 from flask_testing import TestCase
 
-from project.server import db, create_app
-from project.server.models import User
+os.environ.setdefault("APP_SETTINGS", "project.server.config.TestingConfig")
+
+from project.server import db, create_app  # noqa: E402
+from project.server.cache import page_cache, reference_cache, user_cache  # noqa: E402
+from project.server.models import User  # noqa: E402
 
 app = create_app()
 
@@ -15,8 +20,13 @@ class BaseTestCase(TestCase):
         return app
 
     def setUp(self):
+        reference_cache.clear()
+        user_cache.clear()
+        # other tests create apps with caching configs of their own
+        page_cache.init_app(self.app)
+        page_cache.clear()
         db.create_all()
-        user = User(email="ad@min.com", password="admin_user")
+        user = User(user_name="admin", password="admin_user", admin=True)
         db.session.add(user)
         db.session.commit()
 
@@ -1 +1,60 @@
 # tests/helpers.py
+
+
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from sqlalchemy import event
+
+from project.server import db
+from project.server.models import Child, Chore, CompletedChore, User, WeeklyTotals
+from project.server.services import bump_week_versions, week_start_for
+
+
+@contextmanager
+def count_queries():
+    """Collects the SQL statements run against the engine inside the block."""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+
+
+def login(client, user_name="admin", password="admin_user"):
+    return client.post(
+        "/login",
+        data=dict(user_name=user_name, password=password),
+        follow_redirects=True,
+    )
+
+
+def seed_week(week_start, children=2, chores=2, per_child=1):
+    """Adds children and chores with completions and weekly totals for one week, bumping its version."""
+    user = User.query.first()
+    kids = [Child(name=f"child {i}") for i in range(children)]
+    jobs = [Chore(chore=f"chore {i}", value=1.0 + i) for i in range(chores)]
+    db.session.add_all(kids + jobs)
+    db.session.flush()
+    for kid in kids:
+        total = 0
+        for i in range(per_child):
+            job = jobs[i % chores]
+            db.session.add(CompletedChore(chore_id=job.id, child_id=kid.id, user_id=user.id,
+                                          completed_on=week_start + timedelta(days=i % 7)))
+            total += job.value
+        db.session.add(WeeklyTotals(child_id=kid.id, week_start=week_start, total=total))
+    # like every production write, so cached pages of the week are renewed
+    bump_week_versions(week_start_for(week_start + timedelta(days=i % 7)) for i in range(per_child))
+    db.session.commit()
+    return kids, jobs
+
+
+def monday(day=None):
+    day = day or date.today()
+    return day - timedelta(days=day.weekday())
@@ -3,6 +3,7 @@
 
 import unittest
 import os
+from unittest import mock
 
 from flask import current_app
 from flask_testing import TestCase
@@ -52,5 +53,18 @@ class TestProductionConfig(TestCase):
         )
 
 
+class TestDevOnlyExtensions(unittest.TestCase):
+    def test_toolbar_only_for_development(self):
+        # Ensure the debug toolbar is only set up when the config enables it.
+        self.assertNotIn("_debug_toolbar.static", app.view_functions)
+        with mock.patch.dict(os.environ, {"APP_SETTINGS": "project.server.config.DevelopmentConfig"}):
+            dev_app = create_app()
+        self.assertIn("_debug_toolbar.static", dev_app.view_functions)
+
+    def test_sql_echo_is_off_by_default(self):
+        # Ensure SQL echo is driven by the environment.
+        self.assertFalse(app.config["SQLALCHEMY_ECHO"])
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,180 @@
+# project/server/tests/test_api.py
+
+
+import json
+import unittest
+from datetime import date
+from unittest import mock
+
+from flask import g
+
+from base import BaseTestCase
+from helpers import count_queries, login, seed_week
+from project.server import db
+from project.server.api import views as api_views
+from project.server.models import Child, Chore, CompletedChore, MonthlyTotals, User, WeeklyTotals, YearlyTotals
+from project.server.services import record_completion
+
+
+class TestCompletionsApi(BaseTestCase):
+    def setUp(self):
+        super(TestCompletionsApi, self).setUp()
+        db.session.add_all([Child(name="Ann"), Child(name="Ben"),
+                            Chore(chore="Dishes", value=1.5), Chore(chore="Bins", value=0.5)])
+        db.session.commit()
+        login(self.client)
+
+    def test_batch_insert_and_weekly_totals(self):
+        # Ensure a batch is inserted and folded into one total per child and week.
+        items = [
+            dict(child_id=1, chore_id=1, completed_on="2024-01-01"),
+            dict(child_id=1, chore_id=2, completed_on="2024-01-03"),
+            dict(child_id=2, chore_id=1, completed_on="2024-01-03"),
+            dict(child_id=1, chore_id=1, completed_on="2024-01-08"),
+        ]
+        response = self.client.post("/api/completions", json=items)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json["created"], 4)
+        self.assertEqual([r["status"] for r in response.json["results"]], ["created"] * 4)
+        totals = {(t.child_id, t.week_start): t.total for t in WeeklyTotals.query.all()}
+        self.assertEqual(totals, {
+            (1, date(2024, 1, 1)): 2.0,
+            (2, date(2024, 1, 1)): 1.5,
+            (1, date(2024, 1, 8)): 1.5,
+        })
+
+    def test_batch_updates_rollups(self):
+        # Ensure monthly and yearly rollups get one upsert each.
+        items = [dict(child_id=1, chore_id=1, completed_on="2024-01-31"),
+                 dict(child_id=1, chore_id=1, completed_on="2024-02-01")] * 10
+        with count_queries() as statements:
+            self.client.post("/api/completions", json=items)
+        for table in ("weekly_totals", "monthly_totals", "yearly_totals"):
+            self.assertEqual(len([s for s in statements if s.startswith(f"INSERT INTO {table}")]), 1)
+        self.assertEqual(sorted(m.total for m in MonthlyTotals.query.all()), [15.0, 15.0])
+        self.assertEqual(YearlyTotals.query.one().total, 30.0)
+
+    def test_rollup_totals_endpoint(self):
+        # Ensure monthly and yearly totals can be read per child.
+        self.client.post("/api/completions", json=[
+            dict(child_id=1, chore_id=1, completed_on="2023-12-31"),
+            dict(child_id=2, chore_id=2, completed_on="2024-03-02"),
+        ])
+        yearly = self.client.get("/api/totals/yearly?year=2024").json
+        self.assertEqual(yearly["totals"], [dict(child_id=2, child="Ben", period=2024, total=0.5)])
+        monthly = self.client.get("/api/totals/monthly?child_id=1").json
+        self.assertEqual(monthly["totals"], [dict(child_id=1, child="Ann", period="2023-12-01", total=1.5)])
+        self.assertEqual(self.client.get("/api/totals/daily").status_code, 404)
+
+    def test_query_count_does_not_grow_with_batch(self):
+        # Ensure rows go in with one bulk insert.
+        items = [dict(child_id=1, chore_id=1, completed_on="2024-01-02")] * 50
+        with count_queries() as statements:
+            self.client.post("/api/completions", json=items)
+        inserts = [s for s in statements if s.startswith("INSERT INTO completed_chores")]
+        self.assertEqual(len(inserts), 1)
+        self.assertEqual(CompletedChore.query.count(), 50)
+
+    def test_invalid_items_are_reported(self):
+        # Ensure invalid items are reported and valid ones still recorded.
+        items = [
+            dict(child_id=1, chore_id=1),
+            dict(child_id=9, chore_id=1),
+            dict(child_id=1, chore_id=9),
+            dict(child_id=1, chore_id=1, completed_on="yesterday"),
+            "nope",
+            dict(child_id=True, chore_id=1),
+            dict(child_id=1, chore_id=True),
+        ]
+        response = self.client.post("/api/completions", json=items)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([r["status"] for r in response.json["results"]],
+                         ["created", "error", "error", "error", "error", "error", "error"])
+        self.assertEqual(response.json["results"][1]["error"], "unknown child_id")
+        self.assertEqual(response.json["results"][5]["error"], "unknown child_id")
+        self.assertEqual(response.json["results"][6]["error"], "unknown chore_id")
+        self.assertEqual(CompletedChore.query.count(), 1)
+
+    def test_rejects_non_array(self):
+        # Ensure the payload must be a JSON array.
+        response = self.client.post("/api/completions", json=dict(child_id=1))
+        self.assertEqual(response.status_code, 400)
+
+
+class TestWeekApi(BaseTestCase):
+    def setUp(self):
+        super(TestWeekApi, self).setUp()
+        self.kids, self.jobs = seed_week(date(2024, 1, 1), children=2, per_child=2)
+        login(self.client)
+
+    def test_week_summary(self):
+        # Ensure the summary lists per-child totals and the week's completions.
+        response = self.client.get("/api/weeks/2024-01-01/summary")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["week_start"], "2024-01-01")
+        self.assertEqual(response.json["week_end"], "2024-01-07")
+        self.assertEqual(response.json["totals"], [dict(child_id=self.kids[0].id, child="child 0", total=3.0),
+                                                   dict(child_id=self.kids[1].id, child="child 1", total=3.0)])
+        self.assertEqual(len(response.json["completions"]), 4)
+        self.assertEqual(response.json["completions"][0]["completed_on"], "2024-01-02")
+        self.assertEqual(set(response.json["completions"][0]),
+                         {"id", "completed_on", "child_id", "child", "chore_id", "chore", "value"})
+
+    def test_summary_query_count_is_fixed(self):
+        # Ensure the statements do not grow with the number of children.
+        with count_queries() as statements:
+            self.client.get("/api/weeks/2024-01-01/summary")
+        seed_week(date(2024, 1, 1), children=6, per_child=3)
+        # the login leaks an ORM user through g, which the commit above expired
+        g.pop("_login_user", None)
+        with count_queries() as more:
+            response = self.client.get("/api/weeks/2024-01-01/summary")
+        self.assertEqual(len(response.json["totals"]), 8)
+        self.assertEqual(len(more), len(statements))
+
+    def test_week_approvals(self):
+        # Ensure approval state follows the approval page.
+        self.client.post("/approval/?start_of_week=2024-01-01", data=dict(child=self.kids[0].id))
+        approvals = self.client.get("/api/weeks/2024-01-01/approvals").json["approvals"]
+        self.assertEqual([(a["child"], a["approved"], a["approved_by"]) for a in approvals],
+                         [("child 0", True, "admin"), ("child 1", False, None)])
+        self.assertEqual(approvals[1]["approved_on"], None)
+
+    def test_approvals_are_admin_only(self):
+        # Ensure other users cannot read approval state.
+        db.session.add(User(user_name="bob", password="bob_password"))
+        db.session.commit()
+        self.client.get("/logout")
+        g.pop("_login_user", None)
+        login(self.client, "bob", "bob_password")
+        self.assertEqual(self.client.get("/api/weeks/2024-01-01/approvals").status_code, 403)
+        self.assertEqual(self.client.get("/api/weeks/2024-01-01/summary").status_code, 200)
+
+    def test_bad_week(self):
+        # Ensure a malformed start is a JSON 400.
+        response = self.client.get("/api/weeks/last-week/summary")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json["error"], "start must be YYYY-MM-DD")
+
+    def test_polling_gets_not_modified(self):
+        # Ensure a dashboard polling with the ETag gets a 304 until the week changes.
+        etag = self.client.get("/api/weeks/2024-01-01/summary").headers["ETag"]
+        headers = {"If-None-Match": etag}
+        self.assertEqual(self.client.get("/api/weeks/2024-01-01/summary", headers=headers).status_code, 304)
+        record_completion(self.kids[0].id, self.jobs[0].id, 1, completed_on=date(2024, 1, 3))
+        response = self.client.get("/api/weeks/2024-01-01/summary", headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["totals"][0]["total"], 4.0)
+
+    def test_stdlib_fallback(self):
+        # Ensure the body is the same compact JSON without orjson.
+        response = self.client.get("/api/weeks/2024-01-01/summary")
+        with mock.patch.object(api_views, "orjson", None):
+            fallback = self.client.get("/api/weeks/2024-01-01/summary")
+        self.assertEqual(json.loads(fallback.data), json.loads(response.data))
+        self.assertNotIn(b", ", fallback.data)
+        self.assertNotIn(b": ", fallback.data)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,114 @@
+# project/server/tests/test_assets.py
+
+
+import gc
+import gzip
+import json
+import os
+import tempfile
+import unittest
+
+from flask import url_for
+
+from base import BaseTestCase
+from project.server import create_app
+from project.server.assets import build_assets, static_assets
+
+
+class TestStaticAssets(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = static_assets.directory
+        static_assets.directory = os.path.join(self.tmp.name, "dist")
+        self.manifest = build_assets(self.app.static_folder, static_assets.directory)
+        static_assets.load()
+
+    def tearDown(self):
+        static_assets.directory = self.directory
+        static_assets.load()
+        self.tmp.cleanup()
+        super().tearDown()
+
+    def test_build_writes_hashed_copies(self):
+        # Ensure every static file gets a fingerprinted copy and a smaller gzip variant.
+        entry = self.manifest["main.js"]
+        self.assertRegex(entry["path"], r"^main\.[0-9a-f]{12}\.js$")
+        self.assertIn("gzip", entry["encodings"])
+        with open(os.path.join(self.app.static_folder, "main.js"), "rb") as f:
+            source = f.read()
+        with open(os.path.join(static_assets.directory, entry["path"] + ".gz"), "rb") as f:
+            self.assertEqual(gzip.decompress(f.read()), source)
+        self.assertEqual(build_assets(self.app.static_folder, static_assets.directory), self.manifest)
+
+    def test_rebuild_only_removes_its_own_files(self):
+        # Ensure a rebuild drops the previous build's files and leaves anything else alone.
+        directory = static_assets.directory
+        old = os.path.join(directory, "old", "app.0123456789ab.js")
+        os.makedirs(os.path.dirname(old))
+        for path in (old, old + ".gz", os.path.join(directory, "keep.txt")):
+            with open(path, "w") as f:
+                f.write("x")
+        with open(os.path.join(directory, "manifest.json"), "w") as f:
+            json.dump({"old/app.js": dict(path="old/app.0123456789ab.js", encodings=["gzip"])}, f)
+        build_assets(self.app.static_folder, directory)
+        self.assertFalse(os.path.exists(os.path.join(directory, "old")))
+        self.assertTrue(os.path.exists(os.path.join(directory, "keep.txt")))
+        self.assertTrue(os.path.exists(os.path.join(directory, self.manifest["main.js"]["path"])))
+
+    def test_default_build_is_not_a_source(self):
+        # Ensure a leftover build in static/dist is not fingerprinted again into another directory.
+        with tempfile.TemporaryDirectory() as static:
+            with open(os.path.join(static, "main.js"), "w") as f:
+                f.write("x")
+            build_assets(static, os.path.join(static, "dist"))
+            manifest = build_assets(static, os.path.join(self.tmp.name, "elsewhere"))
+        self.assertEqual(list(manifest), ["main.js"])
+
+    def test_refuses_to_build_over_the_static_folder(self):
+        # Ensure a misconfigured output directory cannot wipe the sources.
+        for output_dir in (self.app.static_folder, os.path.dirname(self.app.static_folder)):
+            with self.assertRaises(ValueError):
+                build_assets(self.app.static_folder, output_dir)
+        self.assertTrue(os.path.exists(os.path.join(self.app.static_folder, "main.js")))
+
+    def test_url_for_emits_hashed_urls(self):
+        # Ensure templates link the fingerprinted copies.
+        self.assertEqual(url_for("static", filename="main.js"), f"/static/_/{self.manifest['main.js']['path']}")
+        self.assertEqual(url_for("static", filename="missing.js"), "/static/missing.js")
+        response = self.client.get("/login")
+        self.assertIn(f'/static/_/{self.manifest["main.css"]["path"]}'.encode(), response.data)
+
+    def test_precompressed_variant_is_served(self):
+        # Ensure clients accepting gzip get the prebuilt variant, cached as immutable.
+        path = url_for("static", filename="main.js")
+        response = self.client.get(path, headers={"Accept-Encoding": "gzip, deflate"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertTrue(response.content_type.startswith("text/javascript"))
+        self.assertIn("Accept-Encoding", response.headers["Vary"])
+        self.assertIn("immutable", response.headers["Cache-Control"])
+        self.assertIn("max-age=31536000", response.headers["Cache-Control"])
+        with open(os.path.join(self.app.static_folder, "main.js"), "rb") as f:
+            self.assertEqual(gzip.decompress(response.data), f.read())
+
+        plain = self.client.get(path)
+        self.assertNotIn("Content-Encoding", plain.headers)
+        self.assertIn("immutable", plain.headers["Cache-Control"])
+
+    def test_unhashed_files_are_served_as_before(self):
+        # Ensure plain static URLs keep working.
+        response = self.client.get("/static/main.js")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn("immutable", response.headers.get("Cache-Control", ""))
+        self.assertEqual(self.client.get("/static/_/main.000000000000.js").status_code, 404)
+
+    def test_plain_files_outlive_other_apps(self):
+        # Ensure plain files are served by the app handling the request, not the last one created.
+        create_app()
+        gc.collect()
+        self.assertEqual(self.client.get("/static/main.js").status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
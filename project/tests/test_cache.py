@@ -0,0 +1,239 @@
+# project/server/tests/test_cache.py
+
+
+import datetime
+import glob
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from flask import g
+from sqlalchemy import update
+
+from base import BaseTestCase
+from helpers import count_queries, login, monday, seed_week
+from project.server import db
+from project.server.cache import (
+    PageCache,
+    ReferenceCache,
+    get_children,
+    get_chores,
+    page_cache,
+    reference_cache,
+    user_cache,
+)
+from project.server.models import CacheVersion, Child, Chore, User
+from project.server.services import record_completion
+from project.server.user.forms import DeleteChoreForm
+
+
+class TestReferenceCache(BaseTestCase):
+    def new_request(self):
+        # versions are read once per request
+        g.pop("_reference_versions", None)
+
+    def test_cached_lists_skip_the_table_query(self):
+        # Ensure a warm cache only costs the shared version lookup.
+        db.session.add(Child(name="Ann"))
+        db.session.commit()
+        self.assertEqual([c.name for c in get_children()], ["Ann"])
+        self.new_request()
+        with count_queries() as statements:
+            get_children()
+            get_children()
+        self.assertEqual(len(statements), 1)
+        self.assertIn("cache_versions", statements[0])
+
+    def test_invalidate_reloads_entry(self):
+        # Ensure invalidate() bumps the shared version and reloads.
+        self.assertEqual(get_chores(), [])
+        db.session.add(Chore(chore="Dishes", value=1.5))
+        reference_cache.invalidate("chores")
+        db.session.commit()
+        self.new_request()
+        self.assertEqual([(c.chore, c.value) for c in get_chores()], [("Dishes", 1.5)])
+        self.assertEqual(db.session.get(CacheVersion, "chores").version, 1)
+
+    def test_other_worker_bump_is_noticed(self):
+        # Ensure a version bumped elsewhere invalidates the local entry.
+        self.assertEqual(get_children(), [])
+        db.session.add(Child(name="Ben"))
+        db.session.add(CacheVersion(name="children", version=7))
+        db.session.commit()
+        self.new_request()
+        self.assertEqual([c.name for c in get_children()], ["Ben"])
+
+    def test_cache_is_bounded(self):
+        # Ensure the least recently used entry is evicted.
+        cache = ReferenceCache(maxsize=2)
+        for name in ("a", "b", "c"):
+            cache.get(name, lambda: name)
+        self.assertEqual(list(cache._entries), ["b", "c"])
+
+    def test_delete_form_reads_names_from_the_cache(self):
+        # Ensure the delete form's labels cost one query, however many completions it lists.
+        seed_week(monday(), children=3, chores=3, per_child=4)
+        with self.app.test_request_context():
+            get_children(), get_chores()
+            with count_queries() as statements:
+                form = DeleteChoreForm()
+        self.assertEqual(len(statements), 1)
+        self.assertEqual(len(form.chore_id.choices), 10)
+        self.assertTrue(form.chore_id.choices[0][1].startswith("child 2 - chore 0 - "))
+
+    def test_setup_writes_invalidate(self):
+        # Ensure adding a child through setup shows up in the form choices.
+        login(self.client)
+        self.client.get("/setup")
+        response = self.client.post("/setup", data=dict(name="Cleo"), follow_redirects=True)
+        self.assertIn(b"Child Cleo added.", response.data)
+        self.assertIn(b"Cleo", self.client.get("/").data)
+
+
+class TestUserCache(BaseTestCase):
+    def setUp(self):
+        super(TestUserCache, self).setUp()
+        db.session.add(User(user_name="bob", password="bob_user"))
+        db.session.commit()
+        self.bob = self.app.test_client()
+        login(self.bob, user_name="bob", password="bob_user")
+
+    def get(self, client, path):
+        # the test app context outlives requests, drop flask-login's per-request user
+        g.pop("_login_user", None)
+        return client.get(path)
+
+    def user_queries(self, client, path="/history/"):
+        with count_queries() as statements:
+            self.get(client, path)
+        return [s for s in statements if "FROM users" in s]
+
+    def test_warm_requests_skip_the_user_query(self):
+        # Ensure an authenticated request is served from the cache.
+        self.assertEqual(self.user_queries(self.bob), [])
+
+    def test_expired_entry_reloads(self):
+        # Ensure entries are reloaded once the TTL has passed.
+        user_cache.ttl = 0
+        try:
+            self.assertEqual(len(self.user_queries(self.bob)), 1)
+        finally:
+            user_cache.ttl = self.app.config["USER_CACHE_TTL"]
+
+    def test_session_stamp_forces_refresh(self):
+        # Ensure a session stamped with another version reloads the user.
+        with self.bob.session_transaction() as session:
+            session[user_cache.session_key] += 1
+        self.assertEqual(len(self.user_queries(self.bob)), 1)
+        self.assertEqual(self.user_queries(self.bob), [])
+
+    def test_version_changed_behind_the_cache(self):
+        # Ensure a stamp from a newer version evicts the entry and reloads the row.
+        bob = User.query.filter_by(user_name="bob").first()
+        self.assertEqual(self.get(self.bob, "/setup").status_code, 302)
+        # another worker grants admin and stamps bob's session
+        db.session.execute(update(User).where(User.id == bob.id).values(admin=True, session_version=1))
+        db.session.commit()
+        self.assertEqual(self.get(self.bob, "/setup").status_code, 302)
+        with self.bob.session_transaction() as session:
+            session[user_cache.session_key] = 1
+        self.assertEqual(self.get(self.bob, "/setup").status_code, 200)
+        self.assertEqual(user_cache._entries[bob.id][1], (bob.id, "bob", True, 1))
+
+    def test_admin_grant_applies_immediately(self):
+        # Ensure granting admin is seen on the user's next request.
+        self.assertEqual(self.get(self.bob, "/setup").status_code, 302)
+        g.pop("_login_user", None)
+        login(self.client)
+        response = self.client.post("/setup", data=dict(user_name="bob"), follow_redirects=True)
+        self.assertIn(b"bob is now an admin.", response.data)
+        self.assertEqual(self.get(self.bob, "/setup").status_code, 200)
+        with self.bob.session_transaction() as session:
+            self.assertEqual(session[user_cache.session_key], 1)
+
+
+class TestPageCache(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.app.config.update(PAGE_CACHE_SIZE=16, PAGE_CACHE_DIR=self.tmp.name)
+        page_cache.init_app(self.app)
+        self.week = monday() - datetime.timedelta(weeks=1)
+        self.kids, self.jobs = seed_week(self.week)
+        login(self.client)
+
+    def tearDown(self):
+        self.app.config.update(PAGE_CACHE_SIZE=0, PAGE_CACHE_DIR=None)
+        page_cache.init_app(self.app)
+        self.tmp.cleanup()
+        super().tearDown()
+
+    def statements(self, path):
+        with count_queries() as statements:
+            response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        return statements
+
+    def test_summary_skips_the_week_queries(self):
+        # Ensure a cached week only costs the version lookup.
+        path = f"/summary/?start_of_week={self.week}"
+        self.statements(path)
+        statements = self.statements(path)
+        self.assertEqual(len(statements), 1)
+        self.assertIn("week_versions", statements[0])
+        self.assertIn(b"child 0", self.client.get(path).data)
+
+    def test_completion_invalidates_the_week(self):
+        # Ensure a recorded completion shows up on the next request.
+        path = f"/summary/?start_of_week={self.week}"
+        total = b"child 0 = <b>Total:</b> $3.0"
+        self.assertNotIn(total, self.client.get(path).data)
+        record_completion(self.kids[0].id, self.jobs[1].id, 1, completed_on=self.week)
+        self.assertIn(total, self.client.get(path).data)
+
+    def test_approval_invalidates_the_week(self):
+        # Ensure an approval shows up and the form keeps its choices.
+        path = f"/approval/?start_of_week={self.week}"
+        self.client.get(path)
+        self.assertEqual(len(self.statements(path)), 1)
+        self.assertIn(b'<option value="%d">child 1</option>' % self.kids[1].id, self.client.get(path).data)
+        self.client.post(path, data=dict(child=self.kids[0].id))
+        self.assertIn(b"Approved by:</b> admin", self.client.get(path).data)
+
+    def test_workers_share_files(self):
+        # Ensure an entry written by one worker is read by another.
+        other = PageCache()
+        other.init_app(self.app)
+        page_cache.set(("main.summary", "2024-01-01", "user"), "1", "<p>week</p>")
+        self.assertEqual(other.get(("main.summary", "2024-01-01", "user"), "1"), "<p>week</p>")
+        self.assertIsNone(other.get(("main.summary", "2024-01-01", "user"), "2"))
+        self.assertIsNone(other.get(("main.summary", "2024-01-01", "admin"), "1"))
+
+    def test_cache_is_bounded(self):
+        # Ensure memory and files keep only the most recently used entries.
+        cache = PageCache(maxsize=2, max_files=2)
+        cache.directory = self.tmp.name
+        for week in ("a", "b", "c"):
+            cache.set(("main.summary", week, "user"), "1", week)
+            os.utime(cache._path(("main.summary", week, "user")), (0, ord(week)))
+        cache.prune()
+        self.assertEqual(list(cache._entries), [("main.summary", "b", "user"), ("main.summary", "c", "user")])
+        self.assertFalse(os.path.exists(cache._path(("main.summary", "a", "user"))))
+        self.assertEqual(len(os.listdir(self.tmp.name)), 2)
+
+    def test_clear_only_removes_entries(self):
+        # Ensure clear() leaves foreign files alone and copes with files another worker removed.
+        page_cache.set(("main.summary", "2024-01-01", "user"), "1", "<p>week</p>")
+        foreign = os.path.join(self.tmp.name, "settings.json")
+        with open(foreign, "w") as f:
+            f.write("{}")
+        gone = page_cache._path(("main.summary", "2024-01-08", "user"))
+        found = glob.glob
+        with mock.patch("glob.glob", side_effect=lambda pattern: found(pattern) + [gone]):
+            page_cache.clear()
+        self.assertEqual(os.listdir(self.tmp.name), ["settings.json"])
+
+
+if __name__ == "__main__":
+    unittest.main()
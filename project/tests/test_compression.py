@@ -0,0 +1,103 @@
+# project/server/tests/test_compression.py
+
+
+import gzip
+import unittest
+import zlib
+from datetime import date
+
+from werkzeug.test import EnvironBuilder, run_wsgi_app
+
+from base import BaseTestCase
+from helpers import login, seed_week
+from project.server.compression import ResponseCompression
+
+TEXT = ("text/html", "text/csv")
+
+
+def wsgi_app(chunks, pulled=None, **headers):
+    """A WSGI app yielding chunks as text/html, noting each chunk it hands out."""
+    def app(environ, start_response):
+        start_response("200 OK", [("Content-Type", "text/html; charset=utf-8"), *headers.items()])
+        for chunk in chunks:
+            if pulled is not None:
+                pulled.append(chunk)
+            yield chunk
+    return app
+
+
+def call(app, accept="gzip"):
+    environ = EnvironBuilder(headers={"Accept-Encoding": accept}).get_environ()
+    return run_wsgi_app(app, environ)
+
+
+class TestResponseCompression(unittest.TestCase):
+    def test_streams_chunk_by_chunk(self):
+        # Ensure every chunk is compressed and sent before the next one is pulled.
+        pulled = []
+        chunks = [b"<p>%d</p>" % i * 200 for i in range(3)]
+        app_iter, status, headers = call(ResponseCompression(wsgi_app(chunks, pulled), TEXT))
+        self.assertEqual(headers["Content-Encoding"], "gzip")
+        self.assertNotIn("Content-Length", headers)
+        self.assertEqual(headers["Vary"], "Accept-Encoding")
+
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        body = b""
+        for count, piece in enumerate(app_iter, 1):
+            body += decompressor.decompress(piece)
+            if count <= len(chunks):
+                self.assertEqual(len(pulled), count)
+                self.assertEqual(body, b"".join(chunks[:count]))
+        self.assertEqual(body, b"".join(chunks))
+
+    def test_small_and_encoded_responses_pass_through(self):
+        # Ensure short bodies and already encoded ones are left alone.
+        body = [b"x" * 100]
+        app_iter, _, headers = call(ResponseCompression(wsgi_app(body, **{"Content-Length": "100"}), TEXT))
+        self.assertNotIn("Content-Encoding", headers)
+        self.assertEqual(b"".join(app_iter), body[0])
+
+        data = gzip.compress(b"x" * 1000)
+        app_iter, _, headers = call(ResponseCompression(wsgi_app([data], **{"Content-Encoding": "gzip"}), TEXT))
+        self.assertEqual(b"".join(app_iter), data)
+
+    def test_other_types_and_clients_pass_through(self):
+        # Ensure binary types and clients without gzip get the body as it is.
+        body = [b"x" * 1000]
+        app_iter, _, headers = call(ResponseCompression(wsgi_app(body), ("application/json",)))
+        self.assertNotIn("Content-Encoding", headers)
+        app_iter, _, headers = call(ResponseCompression(wsgi_app(body), TEXT), accept="identity")
+        self.assertNotIn("Content-Encoding", headers)
+        self.assertEqual(b"".join(app_iter), body[0])
+
+    def test_strong_etag_is_weakened(self):
+        # Ensure the compressed body does not claim the identity body's strong tag.
+        app = ResponseCompression(wsgi_app([b"x" * 1000], ETag='"abc"', Vary="Cookie"), TEXT)
+        _, _, headers = call(app)
+        self.assertEqual(headers["ETag"], 'W/"abc"')
+        self.assertEqual(headers["Vary"], "Cookie, Accept-Encoding")
+
+
+class TestCompressedPages(BaseTestCase):
+    def test_pages_are_compressed(self):
+        # Ensure rendered pages go out gzipped to clients that accept it.
+        login(self.client)
+        seed_week(date(2024, 1, 1), children=5)
+        plain = self.client.get("/summary/?start_of_week=2024-01-01")
+        response = self.client.get("/summary/?start_of_week=2024-01-01", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.data), plain.data)
+        self.assertLess(len(response.data), len(plain.data) / 2)
+
+    def test_streamed_export_is_compressed(self):
+        # Ensure the streamed CSV export is compressed as it streams.
+        login(self.client)
+        seed_week(date(2024, 1, 1), children=5, per_child=7)
+        plain = self.client.get("/export/completions?format=csv")
+        response = self.client.get("/export/completions?format=csv", headers={"Accept-Encoding": "gzip"})
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(response.data), plain.data)
+
+
+if __name__ == "__main__":
+    unittest.main()
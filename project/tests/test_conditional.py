@@ -0,0 +1,125 @@
+# project/server/tests/test_conditional.py
+
+
+import datetime
+import unittest
+
+from flask import g
+
+from base import BaseTestCase
+from helpers import count_queries, login, monday, seed_week
+from project.server import db
+from project.server.assets import static_assets
+from project.server.models import User, WeekVersion
+from project.server.services import bump_week_versions, record_completion
+
+
+class TestConditionalGet(BaseTestCase):
+    def setUp(self):
+        super().setUp()
+        self.week = monday() - datetime.timedelta(weeks=1)
+        self.kids, self.jobs = seed_week(self.week)
+        login(self.client)
+
+    def get(self, path, etag=None):
+        headers = {"If-None-Match": etag} if etag else {}
+        return self.client.get(path, headers=headers)
+
+    def test_summary_revalidates(self):
+        # Ensure a repeat request with the ETag gets a 304 without the page queries.
+        path = f"/summary/?start_of_week={self.week}"
+        first = self.get(path)
+        self.assertEqual(first.status_code, 200)
+        self.assertTrue(first.headers["ETag"].startswith('W/"'))
+        self.assertIn("no-cache", first.headers["Cache-Control"])
+        with count_queries() as statements:
+            response = self.get(path, first.headers["ETag"])
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.data, b"")
+        self.assertEqual(response.headers["ETag"], first.headers["ETag"])
+        self.assertEqual(len(statements), 1)
+
+    def test_completion_changes_etag(self):
+        # Ensure recording a completion in the week invalidates its pages.
+        path = f"/summary/?start_of_week={self.week}"
+        etag = self.get(path).headers["ETag"]
+        record_completion(self.kids[0].id, self.jobs[0].id, 1, completed_on=self.week)
+        response = self.get(path, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers["ETag"], etag)
+
+    def test_other_weeks_keep_their_etag(self):
+        # Ensure a write only invalidates the weeks it touches.
+        path = f"/summary/?start_of_week={self.week}"
+        etag = self.get(path).headers["ETag"]
+        record_completion(self.kids[0].id, self.jobs[0].id, 1, completed_on=self.week - datetime.timedelta(weeks=2))
+        self.assertEqual(self.get(path, etag).status_code, 304)
+
+    def test_range_spanning_two_weeks(self):
+        # Ensure a start mid-week is validated against both weeks it shows.
+        path = f"/summary/?start_of_week={self.week + datetime.timedelta(days=3)}"
+        etag = self.get(path).headers["ETag"]
+        bump_week_versions([self.week + datetime.timedelta(weeks=1)])
+        db.session.commit()
+        self.assertEqual(self.get(path, etag).status_code, 200)
+
+    def test_approval_changes_etag(self):
+        # Ensure approving a total invalidates the week's approval page.
+        path = f"/approval/?start_of_week={self.week}"
+        first = self.get(path)
+        self.assertEqual(self.get(path, first.headers["ETag"]).status_code, 304)
+        seeded = db.session.get(WeekVersion, self.week).version
+        self.client.post(path, data=dict(child=self.kids[0].id))
+        db.session.expire_all()
+        self.assertEqual(db.session.get(WeekVersion, self.week).version, seeded + 1)
+        response = self.get(path, first.headers["ETag"])
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"Not Approved", response.data)
+
+    def test_deploy_changes_etag(self):
+        # Ensure new templates or assets invalidate pages stored before the deploy.
+        path = f"/summary/?start_of_week={self.week}"
+        etag = self.get(path).headers["ETag"]
+        build_id, version = self.app.config["BUILD_ID"], static_assets.version
+        try:
+            self.app.config["BUILD_ID"] = "next"
+            self.assertEqual(self.get(path, etag).status_code, 200)
+            self.app.config["BUILD_ID"] = build_id
+            static_assets.version = "next"
+            self.assertEqual(self.get(path, etag).status_code, 200)
+        finally:
+            self.app.config["BUILD_ID"], static_assets.version = build_id, version
+        self.assertEqual(self.get(path, etag).status_code, 304)
+
+    def test_etag_is_per_user(self):
+        # Ensure another user's copy of the page does not validate.
+        path = f"/summary/?start_of_week={self.week}"
+        etag = self.get(path).headers["ETag"]
+        db.session.add(User(user_name="bob", password="bob_password"))
+        db.session.commit()
+        self.client.get("/logout")
+        g.pop("_login_user", None)
+        login(self.client, "bob", "bob_password")
+        self.assertEqual(self.get(path, etag).status_code, 200)
+
+    def test_pending_flash_gets_the_page(self):
+        # Ensure a flashed message is not swallowed by a 304.
+        path = f"/summary/?start_of_week={self.week}"
+        etag = self.get(path).headers["ETag"]
+        with self.client.session_transaction() as session:
+            session["_flashes"] = [("message", "Hello.")]
+        response = self.get(path, etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"Hello.", response.data)
+
+    def test_if_modified_since_alone_is_not_enough(self):
+        # Ensure a date cannot revalidate a page rendered for another user or role.
+        record_completion(self.kids[0].id, self.jobs[0].id, 1, completed_on=self.week)
+        path = f"/summary/?start_of_week={self.week}"
+        last_modified = self.get(path).headers["Last-Modified"]
+        response = self.client.get(path, headers={"If-Modified-Since": last_modified})
+        self.assertEqual(response.status_code, 200)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+# project/server/tests/test_database.py
+
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from sqlalchemy import create_engine, event, text
+
+from base import BaseTestCase
+from project.server import db, sqlite_pragmas
+from project.server.config import BaseConfig
+
+
+class TestSqlitePragmas(BaseTestCase):
+    def test_pragmas_applied_to_app_engine(self):
+        # Ensure the connect hook runs the configured pragmas.
+        self.assertEqual(db.session.execute(text("PRAGMA busy_timeout")).scalar(), 5000)
+        self.assertEqual(db.session.execute(text("PRAGMA temp_store")).scalar(), 2)
+
+
+class TestWalConcurrency(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        url = "sqlite:///{0}".format(os.path.join(self.tmp.name, "wal.sqlite3"))
+        self.engine = create_engine(url)
+        event.listen(self.engine, "connect", sqlite_pragmas(dict(BaseConfig.SQLITE_PRAGMAS, busy_timeout=200)))
+        with self.engine.begin() as conn:
+            conn.execute(text("CREATE TABLE ledger (id INTEGER PRIMARY KEY, value REAL)"))
+            conn.execute(text("INSERT INTO ledger (value) VALUES (1)"))
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def test_journal_mode_is_wal(self):
+        with self.engine.connect() as conn:
+            self.assertEqual(conn.execute(text("PRAGMA journal_mode")).scalar(), "wal")
+            self.assertEqual(conn.execute(text("PRAGMA synchronous")).scalar(), 1)
+
+    def test_readers_not_blocked_by_writer(self):
+        # Ensure reads keep flowing while a write transaction is open and committing.
+        writer_done = threading.Event()
+        errors = []
+
+        def write():
+            try:
+                with self.engine.begin() as conn:
+                    for _ in range(50):
+                        conn.execute(text("INSERT INTO ledger (value) VALUES (1)"))
+                    time.sleep(0.3)
+            except Exception as e:
+                errors.append(e)
+            finally:
+                writer_done.set()
+
+        with self.engine.connect() as reader:
+            reader.execute(text("BEGIN"))
+            self.assertEqual(reader.execute(text("SELECT count(*) FROM ledger")).scalar(), 1)
+
+            thread = threading.Thread(target=write)
+            thread.start()
+            slowest = 0
+            while not writer_done.is_set():
+                started = time.perf_counter()
+                reader.execute(text("SELECT sum(value) FROM ledger")).scalar()
+                slowest = max(slowest, time.perf_counter() - started)
+            thread.join()
+            # the open read transaction keeps its snapshot and did not block the commit
+            self.assertEqual(reader.execute(text("SELECT count(*) FROM ledger")).scalar(), 1)
+            reader.execute(text("COMMIT"))
+
+        self.assertEqual(errors, [])
+        self.assertLess(slowest, 0.1)
+        with self.engine.connect() as conn:
+            self.assertEqual(conn.execute(text("SELECT count(*) FROM ledger")).scalar(), 51)
+
+
+if __name__ == "__main__":
+    unittest.main()
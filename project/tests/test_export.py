@@ -0,0 +1,52 @@
+# project/server/tests/test_export.py
+
+
+import json
+import unittest
+from datetime import date
+
+from base import BaseTestCase
+from helpers import count_queries, login, seed_week
+from project.server import db
+from project.server.export import iter_completions, iter_csv
+
+
+class TestExport(BaseTestCase):
+    def setUp(self):
+        super(TestExport, self).setUp()
+        seed_week(date(2024, 1, 1), children=2, chores=2, per_child=3)
+        login(self.client)
+
+    def test_csv_export(self):
+        # Ensure the CSV export streams a header and every completion.
+        response = self.client.get("/export/completions")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_streamed)
+        lines = response.get_data(as_text=True).splitlines()
+        self.assertEqual(lines[0], "id,completed_on,child_id,child,chore_id,chore,value,user")
+        self.assertEqual(len(lines), 7)
+        self.assertEqual(lines[1], "1,2024-01-01,1,child 0,1,chore 0,1.0,admin")
+
+    def test_ndjson_export_with_filters(self):
+        # Ensure date and child filters apply to the NDJSON export.
+        response = self.client.get("/export/completions?format=ndjson&child_id=2&start=2024-01-02&end=2024-01-03")
+        records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+        self.assertEqual([(r["child"], r["completed_on"]) for r in records],
+                         [("child 1", "2024-01-02"), ("child 1", "2024-01-03")])
+
+    def test_bad_arguments(self):
+        # Ensure unknown formats and dates are rejected.
+        self.assertEqual(self.client.get("/export/completions?format=xml").status_code, 400)
+        self.assertEqual(self.client.get("/export/completions?start=monday").status_code, 400)
+
+    def test_export_is_one_query(self):
+        # Ensure names come from joins rather than per-row lazy loads.
+        db.session.expire_all()
+        with count_queries() as statements:
+            chunks = list(iter_csv(iter_completions(), batch_size=2))
+        self.assertEqual(len(statements), 1)
+        self.assertEqual(len(chunks), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
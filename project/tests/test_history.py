@@ -0,0 +1,77 @@
+# project/server/tests/test_history.py
+
+
+import unittest
+from datetime import date
+
+from sqlalchemy import text
+
+from base import BaseTestCase
+from helpers import count_queries, login, seed_week
+from project.server import db
+from project.server.models import CompletedChore
+from project.server.services import completion_history_query
+
+
+class TestHistory(BaseTestCase):
+    def setUp(self):
+        super(TestHistory, self).setUp()
+        seed_week(date(2024, 1, 1), children=2, chores=3, per_child=5)
+        login(self.client)
+
+    def walk(self, query_string):
+        ids, cursor = [], None
+        while True:
+            url = f"/api/completions?{query_string}" + (f"&after={cursor}" if cursor else "")
+            page = self.client.get(url).json
+            ids.extend(c["id"] for c in page["completions"])
+            cursor = page["next"]
+            if not cursor:
+                return ids
+
+    def test_pages_cover_history_newest_first(self):
+        # Ensure keyset pages return every row once, newest first.
+        expected = [c.id for c in CompletedChore.query.order_by(
+            CompletedChore.completed_on.desc(), CompletedChore.id.desc())]
+        self.assertEqual(self.walk("limit=3"), expected)
+
+    def test_filters(self):
+        # Ensure child, chore and date filters apply across pages.
+        ids = self.walk("limit=2&child_id=2&start=2024-01-02&end=2024-01-04")
+        rows = CompletedChore.query.filter(CompletedChore.id.in_(ids)).all()
+        self.assertEqual(len(rows), 3)
+        self.assertTrue(all(r.child_id == 2 for r in rows))
+
+    def test_deep_page_uses_index(self):
+        # Ensure a page after a cursor is an index search in keyset order, not a scan and sort.
+        for filters in ({}, dict(child_id=1), dict(chore_id=1)):
+            query = completion_history_query(after="2024-01-03_4", **filters).limit(3)
+            compiled = query.statement.compile(dialect=db.engine.dialect, compile_kwargs={"literal_binds": True})
+            plan = [row[-1] for row in db.session.execute(text(f"EXPLAIN QUERY PLAN {compiled}"))]
+            self.assertIn("SEARCH completed_chores", plan[0], (filters, plan))
+            self.assertFalse([step for step in plan if "TEMP B-TREE" in step], (filters, plan))
+
+    def test_deep_page_costs_the_same(self):
+        # Ensure a cursor page runs the same statements as the first page.
+        counts = []
+        for url in ("/api/completions?limit=2", "/api/completions?limit=2&after=2024-01-02_3"):
+            db.session.expire_all()
+            with count_queries() as statements:
+                self.assertEqual(len(self.client.get(url).json["completions"]), 2)
+            counts.append(len(statements))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_history_page(self):
+        # Ensure the HTML history page renders with an Older link.
+        response = self.client.get("/history/?limit=4")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"chore 0", response.data)
+        self.assertIn(b"Older", response.data)
+
+    def test_bad_cursor(self):
+        # Ensure a malformed cursor is rejected.
+        self.assertEqual(self.client.get("/history/?after=yesterday").status_code, 400)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+# project/server/tests/test_indexes.py
+
+
+import unittest
+from datetime import datetime
+
+from sqlalchemy import text
+from sqlalchemy.exc import IntegrityError
+
+from base import BaseTestCase
+from project.server import db
+from project.server.main.views import week_completions_query, weekly_totals_query
+from project.server.models import WeeklyTotals
+from project.server.services import completion_history_query
+from project.server.user.views import week_approvals_query
+
+
+class TestWeekRangeIndexes(BaseTestCase):
+    start_of_week = datetime(2024, 1, 1)
+    end_of_week = datetime(2024, 1, 7, 23, 59, 59)
+
+    def query_plan(self, query):
+        compiled = query.statement.compile(
+            dialect=db.engine.dialect, compile_kwargs={"literal_binds": True}
+        )
+        rows = db.session.execute(text(f"EXPLAIN QUERY PLAN {compiled}")).all()
+        return [row[-1] for row in rows]
+
+    def assertNoFullScan(self, query):
+        plan = self.query_plan(query)
+        scans = [step for step in plan if step.startswith("SCAN")]
+        self.assertEqual(scans, [], f"full scan in plan: {plan}")
+
+    def test_summary_week_range(self):
+        # Ensure the summary's completions range scan on completed_on uses an index.
+        self.assertNoFullScan(week_completions_query(self.start_of_week, self.end_of_week))
+
+    def test_summary_weekly_totals(self):
+        # Ensure the summary's per-child totals read the week's rows through an index.
+        plan = self.query_plan(weekly_totals_query(self.start_of_week, self.end_of_week))
+        self.assertFalse([step for step in plan if step.startswith("SCAN weekly_totals")], plan)
+
+    def test_child_completions_range(self):
+        # Ensure per-child completion lookups use an index.
+        query = completion_history_query(child_id=1, start=self.start_of_week.date(), end=self.end_of_week.date())
+        self.assertNoFullScan(query)
+
+    def test_week_approvals_lookup(self):
+        # Ensure the approval page's week_start lookup reads weekly_totals through an index.
+        plan = self.query_plan(week_approvals_query(self.start_of_week))
+        self.assertFalse([step for step in plan if step.startswith("SCAN weekly_totals")], plan)
+
+    def test_weekly_totals_are_unique(self):
+        # Ensure only one weekly total can exist per child and week.
+        db.session.add(WeeklyTotals(child_id=1, week_start=self.start_of_week.date(), total=1))
+        db.session.commit()
+        db.session.add(WeeklyTotals(child_id=1, week_start=self.start_of_week.date(), total=2))
+        with self.assertRaises(IntegrityError):
+            db.session.commit()
+        db.session.rollback()
+        self.assertEqual(WeeklyTotals.query.count(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,8 +2,12 @@
 
 
 import unittest
+from datetime import timedelta
 
 from base import BaseTestCase
+from helpers import count_queries, login, monday, seed_week
+from project.server import db
+from project.server.cache import page_cache
 
 
 class TestMainBlueprint(BaseTestCase):
@@ -11,14 +15,15 @@ class TestMainBlueprint(BaseTestCase):
         # Ensure Flask is setup.
         response = self.client.get("/", follow_redirects=True)
         self.assertEqual(response.status_code, 200)
-        self.assertIn(b"Welcome!", response.data)
+        self.assertIn(b"Please log in to access this page.", response.data)
         self.assertIn(b"Login", response.data)
 
-    def test_about(self):
-        # Ensure about route behaves correctly.
-        response = self.client.get("/about", follow_redirects=True)
+    def test_summary(self):
+        # Ensure summary route behaves correctly.
+        login(self.client)
+        response = self.client.get("/summary/", follow_redirects=True)
         self.assertEqual(response.status_code, 200)
-        self.assertIn(b"About", response.data)
+        self.assertIn(b"Weekly Summary", response.data)
 
     def test_404(self):
         # Ensure 404 error is handled.
@@ -27,5 +32,41 @@ class TestMainBlueprint(BaseTestCase):
         self.assertTemplateUsed("errors/404.html")
 
 
+class TestSummaryQueries(BaseTestCase):
+    def summary_query_count(self, week_start):
+        # the cost of rendering the week, not of serving it from the page cache
+        page_cache.clear()
+        db.session.expire_all()
+        with count_queries() as statements:
+            response = self.client.get(f"/summary/?start_of_week={week_start}")
+        self.assertEqual(response.status_code, 200)
+        return len(statements)
+
+    def test_summary_query_count_is_constant(self):
+        # Ensure the summary page cost does not grow with rows or children.
+        login(self.client)
+        small_week = monday()
+        large_week = small_week - timedelta(days=7)
+        seed_week(small_week, children=1, chores=1, per_child=1)
+        seed_week(large_week, children=8, chores=5, per_child=6)
+
+        small = self.summary_query_count(small_week)
+        large = self.summary_query_count(large_week)
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, 4)
+
+    def test_summary_lists_weekly_totals(self):
+        # Ensure per-child totals come from the week's WeeklyTotals rows.
+        login(self.client)
+        week = monday()
+        seed_week(week, children=2, chores=2, per_child=2)
+        response = self.client.get(f"/summary/?start_of_week={week}")
+        self.assertIn(b"child 0", response.data)
+        self.assertIn(b"$3.0", response.data)
+        # chore 0 is done on the Monday the week starts on
+        self.assertIn(b"chore 0", response.data)
+        self.assertIn(b"chore 1", response.data)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,136 @@
+# project/server/tests/test_metrics.py
+
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import unittest
+from datetime import date
+
+from base import BaseTestCase
+from helpers import login
+from project.server import db
+from project.server.metrics import Metrics, metrics
+from project.server.models import Child, Chore
+from project.server.services import record_completion
+
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+class TestMetricsEndpoint(BaseTestCase):
+    def test_exposition_format(self):
+        # Ensure /metrics serves histograms and counters per endpoint.
+        self.client.get("/login")
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.content_type.startswith("text/plain"))
+        body = response.data.decode()
+        self.assertIn("# TYPE chore_tracker_request_duration_seconds histogram", body)
+        self.assertIn('chore_tracker_request_duration_seconds_bucket{endpoint="user.login",le="+Inf"}', body)
+        self.assertIn('chore_tracker_requests_total{endpoint="user.login",method="GET",status="200"}', body)
+        self.assertIn('chore_tracker_request_db_queries_count{endpoint="user.login"}', body)
+        self.assertIn("# TYPE chore_tracker_db_pool_checked_out gauge", body)
+
+    def test_completions_counter(self):
+        # Ensure recorded completions are counted.
+        key = ("chore_tracker_completions_recorded_total", ())
+        before = metrics.collect().get(key, 0)
+        db.session.add_all([Child(name="Ann"), Chore(chore="Dishes", value=1.5)])
+        db.session.commit()
+        record_completion(child_id=1, chore_id=1, user_id=1, completed_on=date(2024, 1, 3))
+        login(self.client)
+        self.client.post("/api/completions", json=[dict(child_id=1, chore_id=1)] * 2)
+        self.assertEqual(metrics.collect()[key], before + 3)
+
+
+class TestMultiprocessMetrics(unittest.TestCase):
+    def write(self, directory, pid, entries):
+        with open(os.path.join(directory, f"metrics_{pid}.json"), "w") as f:
+            json.dump(entries, f)
+
+    def test_files_of_all_workers_are_added_up(self):
+        # Ensure counters and histograms add up, and exited workers keep counters but lose gauges.
+        with tempfile.TemporaryDirectory() as tmp:
+            registry = Metrics()
+            registry.directory = tmp
+            registry.inc("chore_tracker_completions_recorded_total", 2)
+            registry.observe("chore_tracker_request_db_queries", 3, endpoint="main.home")
+
+            live, dead = os.getppid(), dead_pid()
+            self.write(tmp, live, [
+                ["chore_tracker_completions_recorded_total", {}, 5],
+                ["chore_tracker_db_pool_checked_out", {}, 1],
+                ["chore_tracker_request_db_queries", {"endpoint": "main.home"}, [0, 1, 0, 0, 0, 0, 0, 0, 2, 1]],
+            ])
+            self.write(tmp, dead, [
+                ["chore_tracker_completions_recorded_total", {}, 7],
+                ["chore_tracker_db_pool_checked_out", {}, 4],
+            ])
+
+            collected = registry.collect()
+            text = registry.render()
+
+        self.assertEqual(collected[("chore_tracker_completions_recorded_total", ())], 14)
+        self.assertEqual(collected[("chore_tracker_db_pool_checked_out", ())], 1)
+        self.assertIn('chore_tracker_request_db_queries_bucket{endpoint="main.home",le="2"} 1', text)
+        self.assertIn('chore_tracker_request_db_queries_bucket{endpoint="main.home",le="5"} 2', text)
+        self.assertIn('chore_tracker_request_db_queries_count{endpoint="main.home"} 2', text)
+        self.assertIn('chore_tracker_request_db_queries_sum{endpoint="main.home"} 5', text)
+
+    def test_exited_workers_are_archived(self):
+        # Ensure an archived worker's counters survive another process reusing its pid.
+        with tempfile.TemporaryDirectory() as tmp:
+            registry = Metrics()
+            registry.directory = tmp
+            dead = dead_pid()
+            for total in (7, 3):
+                self.write(tmp, dead, [
+                    ["chore_tracker_completions_recorded_total", {}, total],
+                    ["chore_tracker_db_pool_checked_out", {}, 4],
+                    ["chore_tracker_request_db_queries", {"endpoint": "main.home"}, [0, 1, 0, 0, 0, 0, 0, 0, 2, 1]],
+                ])
+                registry.archive(dead)
+            self.assertEqual(sorted(os.listdir(tmp)), ["archived.json"])
+            # the pid's next owner starts from zero
+            self.write(tmp, dead, [["chore_tracker_completions_recorded_total", {}, 1]])
+            collected = registry.collect()
+
+        self.assertEqual(collected[("chore_tracker_completions_recorded_total", ())], 11)
+        self.assertEqual(collected[("chore_tracker_request_db_queries", (("endpoint", "main.home"),))],
+                         [0, 2, 0, 0, 0, 0, 0, 0, 4, 2])
+        # only this process's own gauge, if any
+        self.assertEqual(collected.get(("chore_tracker_db_pool_checked_out", ()), 0), 0)
+
+    def test_concurrent_flushes(self):
+        # Ensure request threads flushing at once do not trip over each other.
+        errors = []
+
+        def flush(registry):
+            for _ in range(50):
+                try:
+                    registry.flush()
+                except OSError as error:
+                    errors.append(error)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            registry = Metrics()
+            registry.directory = tmp
+            registry.inc("chore_tracker_completions_recorded_total")
+            threads = [threading.Thread(target=flush, args=(registry,)) for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(os.listdir(tmp), [f"metrics_{os.getpid()}.json"])
+        self.assertEqual(errors, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
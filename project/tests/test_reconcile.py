@@ -0,0 +1,97 @@
+# project/server/tests/test_reconcile.py
+
+
+import os
+import tempfile
+import unittest
+from datetime import date
+
+from sqlalchemy import create_engine
+
+from base import BaseTestCase
+from project.server import db
+from project.server.models import Child, Chore, CompletedChore, MonthlyTotals, User, WeeklyTotals, YearlyTotals
+from project.server.reconcile import (
+    apply_corrections,
+    chunk_daily_sums,
+    date_chunks,
+    expected_totals,
+    find_mismatches,
+    format_mismatch,
+    ledger_daily_sums,
+)
+from project.server.services import record_completion
+
+
+class TestRebuildTotals(BaseTestCase):
+    def setUp(self):
+        super(TestRebuildTotals, self).setUp()
+        db.session.add_all([Child(name="Ann"), Chore(chore="Dishes", value=1.5)])
+        db.session.commit()
+        for day in (date(2024, 1, 3), date(2024, 1, 4), date(2024, 2, 1)):
+            record_completion(child_id=1, chore_id=1, user_id=1, completed_on=day)
+
+    def mismatches(self):
+        return find_mismatches(expected_totals(ledger_daily_sums()))
+
+    def test_consistent_totals_have_no_mismatches(self):
+        # Ensure totals written by the services reconcile cleanly.
+        self.assertEqual(self.mismatches(), [])
+
+    def test_drift_is_reported_and_fixed(self):
+        # Ensure corrupted, missing and orphaned totals are found and fixed.
+        WeeklyTotals.query.filter_by(week_start=date(2024, 1, 1)).one().total = 99
+        MonthlyTotals.query.filter_by(month_start=date(2024, 2, 1)).delete()
+        db.session.add(WeeklyTotals(child_id=1, week_start=date(2023, 1, 2), total=5))
+        db.session.commit()
+
+        mismatches = self.mismatches()
+        report = sorted(format_mismatch(m) for m in mismatches)
+        self.assertEqual(report, [
+            "monthly_totals child_id=1 period=2024-02-01: missing -> 1.5",
+            "weekly_totals child_id=1 period=2023-01-02: 5.0 -> 0",
+            "weekly_totals child_id=1 period=2024-01-01: 99.0 -> 3.0",
+        ])
+
+        apply_corrections(mismatches)
+        self.assertEqual(self.mismatches(), [])
+        self.assertEqual(YearlyTotals.query.one().total, 4.5)
+
+    def test_date_chunks_cover_range(self):
+        # Ensure chunks are contiguous and cover the whole range.
+        chunks = list(date_chunks(date(2024, 1, 1), date(2024, 1, 10), 3))
+        self.assertEqual(chunks, [
+            (date(2024, 1, 1), date(2024, 1, 4)),
+            (date(2024, 1, 5), date(2024, 1, 8)),
+            (date(2024, 1, 9), date(2024, 1, 10)),
+        ])
+
+
+class TestParallelDailySums(unittest.TestCase):
+    def test_chunks_match_single_pass(self):
+        # Ensure per-chunk aggregation adds up to the whole ledger.
+        with tempfile.TemporaryDirectory() as tmp:
+            url = "sqlite:///{0}".format(os.path.join(tmp, "ledger.sqlite3"))
+            engine = create_engine(url)
+            db.metadata.create_all(engine)
+            with engine.begin() as conn:
+                conn.execute(Child.__table__.insert().values(name="Ann"))
+                conn.execute(Chore.__table__.insert().values(chore="Dishes", value=0.5))
+                conn.execute(User.__table__.insert().values(
+                    user_name="admin", password="x", registered_on=date.today(), admin=True))
+                conn.execute(CompletedChore.__table__.insert(), [
+                    dict(chore_id=1, child_id=1, user_id=1, value=0.5, completed_on=date(2024, 1, day))
+                    for day in range(1, 31) for _ in range(3)
+                ])
+            engine.dispose()
+
+            whole = chunk_daily_sums(url, date(2024, 1, 1), date(2024, 1, 31))
+            parts = [row for start, end in date_chunks(date(2024, 1, 1), date(2024, 1, 31), 4)
+                     for row in chunk_daily_sums(url, start, end)]
+        self.assertEqual(sorted(parts), sorted(whole))
+        self.assertEqual(len(whole), 30)
+        self.assertEqual(sum(row[2] for row in whole), 45)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,57 @@
+# project/server/tests/test_sample_data.py
+
+
+import random
+import unittest
+from datetime import date
+
+from sqlalchemy import func
+
+from base import BaseTestCase
+from project.server import db
+from project.server.models import Child, CompletedChore, User, WeeklyTotals
+from project.server.reconcile import expected_totals, find_mismatches, ledger_daily_sums
+from project.server.sample_data import generate_completions, generate_data
+
+
+class TestSampleData(BaseTestCase):
+    def test_totals_match_the_ledger(self):
+        # Ensure the generated rollups agree with the generated completions.
+        inserted = generate_data(children=4, chores=5, users=3, years=1, seed=3, end=date(2024, 6, 30),
+                                 batch_size=500)
+        self.assertEqual(CompletedChore.query.count(), inserted)
+        self.assertGreater(inserted, 1000)
+        self.assertEqual(find_mismatches(expected_totals(ledger_daily_sums(workers=1))), [])
+        self.assertEqual(Child.query.count(), 4)
+        self.assertEqual(User.query.filter_by(admin=True).count(), 2)
+        self.assertFalse(WeeklyTotals.query.filter(WeeklyTotals.approved_by.is_(None)).count())
+        week = WeeklyTotals.query.filter_by(week_start=date(2024, 6, 17)).first()
+        self.assertEqual(week.approved_on, date(2024, 6, 23))
+
+    def test_runs_again_on_existing_data(self):
+        # Ensure a second run adds its own users next to the first run's instead of failing.
+        first = generate_data(children=2, chores=2, users=2, years=1, seed=1, end=date(2024, 6, 30))
+        second = generate_data(children=2, chores=2, users=2, years=1, seed=2, end=date(2024, 6, 30))
+        self.assertEqual(CompletedChore.query.count(), first + second)
+        self.assertEqual(sorted(u.user_name for u in User.query.filter(User.user_name.like("user%"))),
+                         ["user0000", "user0001", "user0002", "user0003"])
+        self.assertEqual(find_mismatches(expected_totals(ledger_daily_sums(workers=1))), [])
+
+    def test_distribution_is_skewed(self):
+        # Ensure the first child is busier than the last.
+        generate_data(children=5, chores=3, users=2, years=1, seed=1, end=date(2024, 6, 30))
+        counts = dict(db.session.query(CompletedChore.child_id, func.count()).group_by(CompletedChore.child_id))
+        self.assertGreater(counts[1], 2 * counts[5])
+
+    def test_same_seed_same_rows(self):
+        # Ensure the generator is deterministic from its seed.
+        def rows(seed):
+            return list(generate_completions(random.Random(seed), [1, 2], [1, 2], [0.5, 1.0], [1],
+                                             date(2024, 1, 1), date(2024, 2, 1), 2.0, 1.0))
+
+        self.assertEqual(rows(7), rows(7))
+        self.assertNotEqual(rows(7), rows(8))
+
+
+if __name__ == "__main__":
+    unittest.main()
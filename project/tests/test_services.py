@@ -0,0 +1,130 @@
+# project/server/tests/test_services.py
+
+
+import multiprocessing
+import os
+import tempfile
+import unittest
+from unittest import mock
+from datetime import date
+
+from sqlalchemy import create_engine, func, select
+
+from base import BaseTestCase
+from helpers import login
+from project.server import db
+from project.server.models import Child, Chore, CompletedChore, MonthlyTotals, User, WeeklyTotals, YearlyTotals
+from project.server.services import delete_completion, record_completion
+
+
+def complete_chores(count):
+    # runs in a fresh process, DATABASE_TEST_URL comes from the parent
+    from project.server import create_app
+
+    app = create_app()
+    with app.app_context():
+        for _ in range(count):
+            record_completion(child_id=1, chore_id=1, user_id=1, completed_on=date(2024, 1, 3))
+
+
+class TestRecordCompletion(BaseTestCase):
+    def setUp(self):
+        super(TestRecordCompletion, self).setUp()
+        db.session.add_all([Child(name="Ann"), Chore(chore="Dishes", value=1.5)])
+        db.session.commit()
+
+    def test_creates_and_bumps_weekly_total(self):
+        # Ensure the first completion creates the week and later ones add to it.
+        record_completion(child_id=1, chore_id=1, user_id=1, completed_on=date(2024, 1, 3))
+        record_completion(child_id=1, chore_id=1, user_id=1, completed_on=date(2024, 1, 7))
+        totals = WeeklyTotals.query.all()
+        self.assertEqual(len(totals), 1)
+        self.assertEqual(totals[0].week_start, date(2024, 1, 1))
+        self.assertEqual(totals[0].total, 3.0)
+        self.assertEqual([c.value for c in CompletedChore.query.all()], [1.5, 1.5])
+
+    def test_snapshots_chore_value(self):
+        # Ensure later chore price changes do not rewrite recorded values.
+        record_completion(child_id=1, chore_id=1, user_id=1)
+        db.session.get(Chore, 1).value = 9
+        db.session.commit()
+        self.assertEqual(CompletedChore.query.first().value, 1.5)
+
+    def test_unknown_chore(self):
+        # Ensure nothing is written for a missing chore.
+        self.assertIsNone(record_completion(child_id=1, chore_id=42, user_id=1))
+        self.assertEqual(CompletedChore.query.count(), 0)
+        self.assertEqual(WeeklyTotals.query.count(), 0)
+
+    def test_rollups_follow_inserts_and_deletes(self):
+        # Ensure monthly and yearly totals move with the ledger.
+        first = record_completion(child_id=1, chore_id=1, user_id=1, completed_on=date(2024, 1, 31))
+        record_completion(child_id=1, chore_id=1, user_id=1, completed_on=date(2024, 2, 1))
+        record_completion(child_id=1, chore_id=1, user_id=1, completed_on=date(2025, 1, 1))
+        self.assertEqual({(m.month_start, m.total) for m in MonthlyTotals.query.all()},
+                         {(date(2024, 1, 1), 1.5), (date(2024, 2, 1), 1.5), (date(2025, 1, 1), 1.5)})
+        self.assertEqual({(y.year, y.total) for y in YearlyTotals.query.all()}, {(2024, 3.0), (2025, 1.5)})
+
+        delete_completion(first)
+        self.assertEqual(MonthlyTotals.query.filter_by(month_start=date(2024, 1, 1)).one().total, 0)
+        self.assertEqual(YearlyTotals.query.filter_by(year=2024).one().total, 1.5)
+        self.assertEqual(WeeklyTotals.query.filter_by(week_start=date(2024, 1, 29)).one().total, 1.5)
+        self.assertEqual(CompletedChore.query.count(), 2)
+        self.assertIsNone(delete_completion(first))
+
+    def test_setup_delete_uses_snapshot_value(self):
+        # Ensure deleting through setup subtracts the value that was recorded.
+        completion_id = record_completion(child_id=1, chore_id=1, user_id=1, completed_on=date(2024, 1, 3))
+        db.session.get(Chore, 1).value = 9
+        db.session.commit()
+        login(self.client)
+        response = self.client.post("/setup", data=dict(chore_id=completion_id), follow_redirects=True)
+        self.assertIn(b"Chore deleted.", response.data)
+        self.assertEqual(WeeklyTotals.query.one().total, 0)
+        self.assertEqual(YearlyTotals.query.one().total, 0)
+
+    def test_home_post_records_completion(self):
+        # Ensure the home form goes through the completion service.
+        login(self.client)
+        response = self.client.post("/", data=dict(child=1, chore=1), follow_redirects=True)
+        self.assertIn(b"Chore assigned.", response.data)
+        self.assertEqual(db.session.query(func.sum(WeeklyTotals.total)).scalar(), 1.5)
+
+
+class TestParallelCompletions(unittest.TestCase):
+    workers = 4
+    per_worker = 25
+
+    def test_totals_stay_exact_under_parallel_workers(self):
+        # Ensure concurrent processes never lose a weekly total update.
+        with tempfile.TemporaryDirectory() as tmp:
+            url = "sqlite:///{0}".format(os.path.join(tmp, "stress.sqlite3"))
+            engine = create_engine(url)
+            db.metadata.create_all(engine)
+            with engine.begin() as conn:
+                conn.execute(Child.__table__.insert().values(name="Ann"))
+                conn.execute(Chore.__table__.insert().values(chore="Dishes", value=0.5))
+                conn.execute(User.__table__.insert().values(
+                    user_name="admin", password="x", registered_on=date.today(), admin=True))
+
+            ctx = multiprocessing.get_context("spawn")
+            procs = [ctx.Process(target=complete_chores, args=(self.per_worker,)) for _ in range(self.workers)]
+            with mock.patch.dict(os.environ, {"DATABASE_TEST_URL": url}):
+                for proc in procs:
+                    proc.start()
+            for proc in procs:
+                proc.join(60)
+                self.assertEqual(proc.exitcode, 0)
+
+            with engine.connect() as conn:
+                completions = conn.execute(select(func.count()).select_from(CompletedChore.__table__)).scalar()
+                totals = conn.execute(select(WeeklyTotals.total)).scalars().all()
+            engine.dispose()
+
+        expected = self.workers * self.per_worker
+        self.assertEqual(completions, expected)
+        self.assertEqual(totals, [expected * 0.5])
+
+
+if __name__ == "__main__":
+    unittest.main()
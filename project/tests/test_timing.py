@@ -0,0 +1,82 @@
+# project/server/tests/test_timing.py
+
+
+import json
+import logging
+import re
+import unittest
+
+from flask.logging import has_level_handler
+
+from base import BaseTestCase
+from helpers import count_queries, login
+from project.server import timing
+
+
+def server_timing(response):
+    return {
+        name: (float(dur), desc)
+        for name, dur, desc in re.findall(r'(\w+);dur=([\d.]+)(?:;desc="([^"]*)")?',
+                                          response.headers["Server-Timing"])
+    }
+
+
+class TestRequestTiming(BaseTestCase):
+    def test_server_timing_header(self):
+        # Ensure the header reports statements, db, render and total time.
+        login(self.client)
+        with count_queries() as statements:
+            response = self.client.get("/summary/")
+        timing = server_timing(response)
+        self.assertEqual(set(timing), {"db", "render", "total"})
+        self.assertEqual(timing["db"][1], f"{len(statements)} queries")
+        self.assertGreater(timing["render"][0], 0)
+        self.assertGreaterEqual(timing["total"][0], timing["db"][0] + timing["render"][0])
+
+    def test_header_can_be_turned_off(self):
+        # Ensure SERVER_TIMING controls the header.
+        self.app.config["SERVER_TIMING"] = False
+        try:
+            response = self.client.get("/login")
+        finally:
+            self.app.config["SERVER_TIMING"] = True
+        self.assertNotIn("Server-Timing", response.headers)
+
+    def test_request_log_line(self):
+        # Ensure one structured line is logged per request.
+        self.app.config["REQUEST_LOG"] = True
+        try:
+            with self.assertLogs("project.server.timing", "INFO") as logs:
+                self.client.get("/login")
+        finally:
+            self.app.config["REQUEST_LOG"] = False
+        line = json.loads(logs.records[-1].getMessage())
+        self.assertEqual((line["endpoint"], line["status"], line["path"]), ("user.login", 200, "/login"))
+        self.assertIn("db_ms", line)
+
+    def test_logger_is_configured(self):
+        # Ensure the timing logger gets a handler and the level REQUEST_LOG asks for.
+        self.assertEqual(timing.logger.level, logging.WARNING)
+        self.assertTrue(has_level_handler(timing.logger))
+        self.app.config["REQUEST_LOG"] = True
+        try:
+            timing.configure_logger(self.app)
+            self.assertEqual(timing.logger.level, logging.INFO)
+        finally:
+            self.app.config["REQUEST_LOG"] = False
+            timing.configure_logger(self.app)
+
+    def test_slow_query_log(self):
+        # Ensure statements over the threshold are logged with their endpoint.
+        login(self.client)
+        self.app.config["SLOW_QUERY_MS"] = 0
+        try:
+            with self.assertLogs("project.server.timing", "WARNING") as logs:
+                self.client.get("/summary/")
+        finally:
+            self.app.config["SLOW_QUERY_MS"] = 100
+        self.assertTrue(any("endpoint=main.summary" in m and "completed_chores" in m for m in logs.output))
+
+
+if __name__ == "__main__":
+    unittest.main()
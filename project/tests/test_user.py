@@ -2,13 +2,17 @@
 
 
 import datetime
+import threading
 import unittest
+from unittest import mock
 
 from flask_login import current_user
 
 from base import BaseTestCase
-from project.server import bcrypt
-from project.server.models import User
+from helpers import count_queries, login, monday, seed_week
+from project.server import bcrypt, db
+from project.server.cache import page_cache
+from project.server.models import User, WeeklyTotals
 from project.server.user.forms import LoginForm
 
 
@@ -18,14 +22,14 @@ class TestUserBlueprint(BaseTestCase):
         with self.client:
             response = self.client.post(
                 "/login",
-                data=dict(email="ad@min.com", password="admin_user"),
+                data=dict(user_name="admin", password="admin_user"),
                 follow_redirects=True,
             )
             self.assertIn(b"Welcome", response.data)
             self.assertIn(b"Logout", response.data)
-            self.assertIn(b"Members", response.data)
-            self.assertTrue(current_user.email == "ad@min.com")
-            self.assertTrue(current_user.is_active())
+            self.assertIn(b"Setup", response.data)
+            self.assertTrue(current_user.user_name == "admin")
+            self.assertTrue(current_user.is_active)
             self.assertEqual(response.status_code, 200)
 
     def test_logout_behaves_correctly(self):
@@ -33,7 +37,7 @@ class TestUserBlueprint(BaseTestCase):
         with self.client:
             self.client.post(
                 "/login",
-                data=dict(email="ad@min.com", password="admin_user"),
+                data=dict(user_name="admin", password="admin_user"),
                 follow_redirects=True,
             )
             response = self.client.get("/logout", follow_redirects=True)
@@ -47,17 +51,17 @@ class TestUserBlueprint(BaseTestCase):
 
     def test_member_route_requires_login(self):
         # Ensure member route requres logged in user.
-        response = self.client.get("/members", follow_redirects=True)
+        response = self.client.get("/setup", follow_redirects=True)
         self.assertIn(b"Please log in to access this page", response.data)
 
     def test_validate_success_login_form(self):
         # Ensure correct data validates.
-        form = LoginForm(email="ad@min.com", password="admin_user")
+        form = LoginForm(user_name="admin", password="admin_user")
         self.assertTrue(form.validate())
 
-    def test_validate_invalid_email_format(self):
-        # Ensure invalid email format throws error.
-        form = LoginForm(email="unknown", password="example")
+    def test_validate_missing_user_name(self):
+        # Ensure a missing user name throws error.
+        form = LoginForm(user_name="", password="example")
         self.assertFalse(form.validate())
 
     def test_get_by_id(self):
@@ -65,7 +69,7 @@ class TestUserBlueprint(BaseTestCase):
         with self.client:
             self.client.post(
                 "/login",
-                data=dict(email="ad@min.com", password="admin_user"),
+                data=dict(user_name="admin", password="admin_user"),
                 follow_redirects=True,
             )
             self.assertTrue(current_user.id == 1)
@@ -75,26 +79,24 @@ class TestUserBlueprint(BaseTestCase):
         with self.client:
             self.client.post(
                 "/login",
-                data=dict(email="ad@min.com", password="admin_user"),
+                data=dict(user_name="admin", password="admin_user"),
                 follow_redirects=True,
             )
-            user = User.query.filter_by(email="ad@min.com").first()
+            user = User.query.filter_by(user_name="admin").first()
             self.assertIsInstance(user.registered_on, datetime.datetime)
 
     def test_check_password(self):
         # Ensure given password is correct after unhashing.
-        user = User.query.filter_by(email="ad@min.com").first()
-        self.assertTrue(
-            bcrypt.check_password_hash(user.password, "admin_user")
-        )
-        self.assertFalse(bcrypt.check_password_hash(user.password, "foobar"))
+        user = User.query.filter_by(user_name="admin").first()
+        self.assertTrue(user.check_password("admin_user"))
+        self.assertFalse(user.check_password("foobar"))
 
     def test_validate_invalid_password(self):
         # Ensure user can't login when the pasword is incorrect.
         with self.client:
             response = self.client.post(
                 "/login",
-                data=dict(email="ad@min.com", password="foo_bar"),
+                data=dict(user_name="admin", password="foo_bar"),
                 follow_redirects=True,
             )
         self.assertIn(b"Invalid email and/or password.", response.data)
@@ -110,17 +112,96 @@ class TestUserBlueprint(BaseTestCase):
             response = self.client.post(
                 "/register",
                 data=dict(
-                    email="test@tester.com",
+                    user_name="tester",
                     password="testing",
                     confirm="testing",
                 ),
                 follow_redirects=True,
             )
-            self.assertIn(b"Welcome", response.data)
-            self.assertTrue(current_user.email == "test@tester.com")
-            self.assertTrue(current_user.is_active())
+            self.assertIn(b"Thank you for registering.", response.data)
+            self.assertTrue(current_user.user_name == "tester")
+            self.assertTrue(current_user.is_active)
             self.assertEqual(response.status_code, 200)
 
 
+class TestApproval(BaseTestCase):
+    def approval_query_count(self, week_start):
+        # the cost of rendering the week, not of serving it from the page cache
+        page_cache.clear()
+        db.session.expire_all()
+        with count_queries() as statements:
+            response = self.client.get(f"/approval/?start_of_week={week_start}")
+        self.assertEqual(response.status_code, 200)
+        return len(statements)
+
+    def test_approval_query_count_ignores_history(self):
+        # Ensure the approval page cost depends only on the selected week.
+        login(self.client)
+        week = monday()
+        seed_week(week, children=2)
+        before = self.approval_query_count(week)
+        for weeks_ago in range(1, 6):
+            seed_week(week - datetime.timedelta(weeks=weeks_ago), children=3)
+        self.assertEqual(self.approval_query_count(week), before)
+
+    def test_approve_weekly_total(self):
+        # Ensure approving a child marks only the selected week's total.
+        login(self.client)
+        week = monday()
+        kids, _ = seed_week(week, children=2)
+        response = self.client.post(
+            f"/approval/?start_of_week={week}",
+            data=dict(child=kids[0].id),
+            follow_redirects=True,
+        )
+        self.assertIn(b"allowance has been approved by admin", response.data)
+        totals = {t.child_id: t for t in WeeklyTotals.query.all()}
+        self.assertIsNotNone(totals[kids[0].id].approved_by)
+        self.assertIsNone(totals[kids[1].id].approved_by)
+
+
+class TestPasswordHashing(BaseTestCase):
+    def test_hashing_runs_on_the_pool(self):
+        # Ensure bcrypt runs on the bounded hashing pool, not the request thread.
+        threads = []
+        real_hash = bcrypt.generate_password_hash
+
+        def record_thread(*args):
+            threads.append(threading.current_thread().name)
+            return real_hash(*args)
+
+        with mock.patch.object(bcrypt, "generate_password_hash", side_effect=record_thread):
+            User(user_name="pool", password="secret")
+        self.assertTrue(threads[0].startswith("bcrypt"))
+
+    def test_outdated_cost_is_upgraded_on_login(self):
+        # Ensure a successful login rehashes a password made with fewer rounds.
+        user = User.query.filter_by(user_name="admin").first()
+        self.assertTrue(user.password.startswith("$2b$04$"))
+        session_version = user.session_version
+        self.app.config["BCRYPT_LOG_ROUNDS"] = 5
+        try:
+            login(self.client)
+        finally:
+            self.app.config["BCRYPT_LOG_ROUNDS"] = 4
+        db.session.expire_all()
+        user = User.query.filter_by(user_name="admin").first()
+        self.assertTrue(user.password.startswith("$2b$05$"))
+        self.assertTrue(user.check_password("admin_user"))
+        # the same password, so other sessions stay signed in
+        self.assertEqual(user.session_version, session_version)
+
+    def test_failed_login_keeps_hash(self):
+        # Ensure a wrong password never triggers a rehash.
+        before = User.query.filter_by(user_name="admin").first().password
+        self.app.config["BCRYPT_LOG_ROUNDS"] = 5
+        try:
+            login(self.client, password="wrong")
+        finally:
+            self.app.config["BCRYPT_LOG_ROUNDS"] = 4
+        db.session.expire_all()
+        self.assertEqual(User.query.filter_by(user_name="admin").first().password, before)
+
+
 if __name__ == "__main__":
     unittest.main()
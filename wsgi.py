@@ -0,0 +1,13 @@
+# wsgi.py
+#
+# Production entry point for gunicorn. Builds only the app, without the
+# management commands and test tooling pulled in by manage.py.
+
+
+import os
+
+os.environ.setdefault("APP_SETTINGS", "project.server.config.ProductionConfig")
+
+from project.server import create_app  # noqa: E402
+
+app = create_app()